@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""Startup."""
+
+# import-time and construction-time benchmark of oaiv.core.account;
+# every measurement runs in a fresh interpreter, so that nothing is cached in sys.modules:
+#
+#     python benchmarks/startup.py --repeat 5 --max-import 0.5 --max-construct 0.05
+#
+# the exit code is 1 if a median exceeds its limit or if a heavy module gets imported on startup
+
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+
+HEAVY_MODULES = ['pandas', 'numpy', 'web3', 'eth_account', 'eth_utils', 'bitcoinlib', 'oaiv_btc', 'requests', 'aiohttp']
+
+ETHEREUM_KWG = {'etherscan_api_key': 'key', 'ethplorer_api_key': 'key', 'ethereum_network': 'mainnet',
+                'infura_project_id': 'project'}
+
+SCENARIO = """
+import sys
+import json
+import time
+
+start = time.perf_counter()
+from {module} import {facade}
+imported = time.perf_counter()
+interaction = {facade}(bitcoin_kwg={{}}, ethereum_kwg={ethereum_kwg})
+constructed = time.perf_counter()
+print(json.dumps({{
+    'import': imported - start,
+    'construct': constructed - imported,
+    'loaded': [name for name in {heavy} if name in sys.modules],
+}}))
+"""
+
+SCENARIOS = {
+    'sync': ('oaiv.core.account', 'InteractionFunctionality'),
+    'async': ('oaiv.core.async_account', 'AsyncInteractionFunctionality'),
+}
+
+
+def measure(module, facade):
+    code = SCENARIO.format(module=module, facade=facade, ethereum_kwg=repr(ETHEREUM_KWG), heavy=repr(HEAVY_MODULES))
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="oaiv startup benchmark")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--max-import', type=float, default=None, help="limit for the median import time, seconds")
+    parser.add_argument('--max-construct', type=float, default=None,
+                        help="limit for the median construction time, seconds")
+    args = parser.parse_args()
+
+    failed = False
+    for name, (module, facade) in SCENARIOS.items():
+        runs = [measure(module=module, facade=facade) for _ in range(args.repeat)]
+        import_time = statistics.median([run['import'] for run in runs])
+        construct_time = statistics.median([run['construct'] for run in runs])
+        loaded = sorted(set(sum([run['loaded'] for run in runs], [])))
+        print("{0:>6}: import {1:.4f} s, construct {2:.6f} s, heavy modules loaded: {3}".format(
+            name, import_time, construct_time, ', '.join(loaded) or 'none'))
+
+        if args.max_import is not None and import_time > args.max_import:
+            print("{0}: import time {1:.4f} s exceeds {2} s".format(name, import_time, args.max_import))
+            failed = True
+        if args.max_construct is not None and construct_time > args.max_construct:
+            print("{0}: construction time {1:.6f} s exceeds {2} s".format(name, construct_time, args.max_construct))
+            failed = True
+        if loaded:
+            print("{0}: heavy modules are imported on startup: {1}".format(name, ', '.join(loaded)))
+            failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -72,9 +72,10 @@ def _invalid_token_handler(invalid_value):
 
 
 def get_precision_eth(w3, token_name):
+    # the contract object comes from the shared registry (imported here, as it depends on this module)
+    from oaiv.tools.contracts import contract_registry
     token_contract_address = get_contract_eth(token_name=token_name)
-    address2 = w3.to_checksum_address(token_contract_address)
-    contract = w3.eth.contract(address2, abi=EIP20_ABI)
+    contract = contract_registry.contract(w3=w3, address=token_contract_address)
     return contract.functions.decimals().call()
 
 
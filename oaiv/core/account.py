@@ -2,29 +2,80 @@
 """Account."""
 
 import time
-import json
-import datetime
+import heapq
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
 from decimal import Decimal
 
-import pandas
-from web3 import Web3
-from urllib import parse, request
-from eth_account.messages import encode_defunct
-from bitcoinlib.encoding import EncodingError
-from bitcoinlib.config.config import DEFAULT_NETWORK
-from bitcoinlib.services.services import Service
-from bitcoinlib.keys import HDKey, Address, BKeyError
-from oaiv_btc.func import Transactor
-
+from oaiv.tools.lazy import lazy_import
 from oaiv.tools.utils import format_provider, format_w3, data_constructor
-from oaiv.tools.address import find_address
-from oaiv.constants import BlockchainType
+from oaiv.tools.tokens import token_registry as default_token_registry
+from oaiv.tools.transport import HTTPTransport
+from oaiv.tools.nonce import NonceManager
+from oaiv.tools.gas import GasOracle
+from oaiv.tools.normalize import etherscan_frame, bitcoin_frame, format_frame
+from oaiv.tools.bulk import bulk_map, chunked, RateLimiter, DEFAULT_MAX_WORKERS
+from oaiv.tools.tracker import ConfirmationTracker
+from oaiv.tools.derivation import AddressDeriver
+from oaiv.tools.validation import bitcoin_address_validator, ethereum_address_validator
+from oaiv.tools.keypair import bitcoin_key_pair, ethereum_key_pair, verify_key_pairs
+from oaiv.tools.balances import BalanceMatrix
+from oaiv.core.watch import WatchOnlyActors
+from oaiv.constants import BlockchainType, blockchain_name
+
+
+# pandas, web3, bitcoinlib and oaiv_btc take seconds to import together, so they are only imported on first use
+pandas = lazy_import('pandas')
+eth_utils = lazy_import('eth_utils')
+bitcoinlib_encoding = lazy_import('bitcoinlib.encoding')
+bitcoinlib_config = lazy_import('bitcoinlib.config.config')
+bitcoinlib_services = lazy_import('bitcoinlib.services.services')
+bitcoinlib_keys = lazy_import('bitcoinlib.keys')
+oaiv_btc_func = lazy_import('oaiv_btc.func')
+
+logger = logging.getLogger(__name__)
 
 
 class InteractionFunctionality:
+    # each backend is only made on first use, so that e.g. an Ethereum-only worker never builds a bitcoinlib Service
     def __init__(self, bitcoin_kwg, ethereum_kwg):
-        self.bitcoin_interaction = InteractionFunctionalityBitcoin(**bitcoin_kwg)
-        self.ethereum_interaction = InteractionFunctionalityEthereum(**ethereum_kwg)
+        self.bitcoin_kwg = bitcoin_kwg
+        self.ethereum_kwg = ethereum_kwg
+        self._bitcoin_interaction = None
+        self._ethereum_interaction = None
+        self._lock = threading.Lock()
+
+    def _make_bitcoin_interaction(self):
+        return InteractionFunctionalityBitcoin(**self.bitcoin_kwg)
+
+    def _make_ethereum_interaction(self):
+        return InteractionFunctionalityEthereum(**self.ethereum_kwg)
+
+    @property
+    def bitcoin_interaction(self):
+        if self._bitcoin_interaction is None:
+            with self._lock:
+                if self._bitcoin_interaction is None:
+                    self._bitcoin_interaction = self._make_bitcoin_interaction()
+        return self._bitcoin_interaction
+
+    @bitcoin_interaction.setter
+    def bitcoin_interaction(self, value):
+        self._bitcoin_interaction = value
+
+    @property
+    def ethereum_interaction(self):
+        if self._ethereum_interaction is None:
+            with self._lock:
+                if self._ethereum_interaction is None:
+                    self._ethereum_interaction = self._make_ethereum_interaction()
+        return self._ethereum_interaction
+
+    @ethereum_interaction.setter
+    def ethereum_interaction(self, value):
+        self._ethereum_interaction = value
 
     def _invalid_blockchain_handler(self, invalid_value):
         raise ValueError(f"Invalid blockchain type provided, should be BlockchainType.ETHEREUM or BlockchainType.BITCOIN; you provided {invalid_value}")
@@ -61,6 +112,14 @@ class InteractionFunctionality:
         else:
             self._invalid_blockchain_handler(blockchain)
 
+    def validate_addresses(self, addresses, blockchain):
+        if blockchain == BlockchainType.ETHEREUM:
+            return self.ethereum_interaction.validate_addresses(addresses=addresses)
+        elif blockchain == BlockchainType.BITCOIN:
+            return self.bitcoin_interaction.validate_addresses(addresses=addresses)
+        else:
+            self._invalid_blockchain_handler(blockchain)
+
     def is_key_pair(self, blockchain, private_key, address):
         if blockchain == BlockchainType.ETHEREUM:
             return self.ethereum_interaction.is_key_pair(private_key=private_key, address=address)
@@ -69,6 +128,14 @@ class InteractionFunctionality:
         else:
             self._invalid_blockchain_handler(blockchain)
 
+    def verify_key_pairs(self, pairs, blockchain, processes=None):
+        if blockchain == BlockchainType.ETHEREUM:
+            return self.ethereum_interaction.verify_key_pairs(pairs=pairs, processes=processes)
+        elif blockchain == BlockchainType.BITCOIN:
+            return self.bitcoin_interaction.verify_key_pairs(pairs=pairs, processes=processes)
+        else:
+            self._invalid_blockchain_handler(blockchain)
+
     def balance(self, addresses, blockchain):
         if blockchain == BlockchainType.ETHEREUM:
             return self.ethereum_interaction.balance(addresses=addresses)
@@ -77,6 +144,81 @@ class InteractionFunctionality:
         else:
             self._invalid_blockchain_handler(blockchain)
 
+    def balance_bulk(self, addresses, blockchain):
+        if blockchain == BlockchainType.ETHEREUM:
+            return self.ethereum_interaction.balance_bulk(addresses=addresses)
+        elif blockchain == BlockchainType.BITCOIN:
+            return self.bitcoin_interaction.balance_bulk(addresses=addresses)
+        else:
+            self._invalid_blockchain_handler(blockchain)
+
+    def _backend(self, blockchain):
+        if blockchain == BlockchainType.ETHEREUM:
+            return self.ethereum_interaction
+        elif blockchain == BlockchainType.BITCOIN:
+            return self.bitcoin_interaction
+        else:
+            self._invalid_blockchain_handler(blockchain)
+
+    def _portfolio_groups(self, holdings):
+        groups = {}
+        for address, blockchain in holdings:
+            self._backend(blockchain=blockchain)
+            groups.setdefault(blockchain, []).append(address)
+        return groups
+
+    @staticmethod
+    def _portfolio_view(groups, outcomes, timeout):
+        # outcomes: {blockchain: (result, failures, elapsed)} for the sources which answered in time
+        view = {'balances': {}, 'totals': {}, 'failures': {}, 'sources': {}}
+        for blockchain, addresses in groups.items():
+            if blockchain in outcomes:
+                result, failures, elapsed = outcomes[blockchain]
+                if isinstance(result, Exception):
+                    result, failures = {}, {address: result for address in addresses}
+                status = 'ok' if not failures else ('partial' if result else 'failed')
+            else:
+                error = TimeoutError("{0} balances are not received within {1} seconds".format(
+                    blockchain_name(blockchain), timeout))
+                result, failures, elapsed, status = {}, {address: error for address in addresses}, timeout, 'timeout'
+
+            for address in result.keys():
+                view['balances'][address] = result[address]
+                for currency, value in result[address].items():
+                    view['totals'][currency] = view['totals'].get(currency, 0) + value
+            view['failures'].update(failures)
+            view['sources'][blockchain_name(blockchain)] = {
+                'addresses': len(addresses),
+                'received': len(result),
+                'elapsed': elapsed,
+                'status': status,
+            }
+        return view
+
+    def portfolio(self, holdings, timeout=None):
+        # holdings are (address, BlockchainType) pairs; every chain is asked once for all of its addresses,
+        # the chains are asked concurrently, and a chain which does not answer within timeout seconds is reported
+        # as 'timeout' in sources while the balances of the other chains are still returned
+        groups = self._portfolio_groups(holdings=holdings)
+
+        def fetch(blockchain):
+            start = time.perf_counter()
+            try:
+                result, failures = self._backend(blockchain=blockchain).balance_bulk(addresses=groups[blockchain])
+            except Exception as e:
+                result, failures = e, {}
+            return result, failures, time.perf_counter() - start
+
+        executor = ThreadPoolExecutor(max_workers=max(1, len(groups)))
+        try:
+            futures = {blockchain: executor.submit(fetch, blockchain) for blockchain in groups.keys()}
+            done, _ = wait(futures.values(), timeout=timeout)
+        finally:
+            # a source which timed out is not waited for
+            executor.shutdown(wait=False, cancel_futures=True)
+        outcomes = {blockchain: future.result() for blockchain, future in futures.items() if future in done}
+        return self._portfolio_view(groups=groups, outcomes=outcomes, timeout=timeout)
+
     def get_transactions(self, blockchain, **kwargs):
         if blockchain == BlockchainType.ETHEREUM:
             return self.ethereum_interaction.get_transactions(**kwargs)
@@ -85,6 +227,14 @@ class InteractionFunctionality:
         else:
             self._invalid_blockchain_handler(blockchain)
 
+    def iter_transactions(self, blockchain, **kwargs):
+        if blockchain == BlockchainType.ETHEREUM:
+            return self.ethereum_interaction.iter_transactions(**kwargs)
+        elif blockchain == BlockchainType.BITCOIN:
+            return self.bitcoin_interaction.iter_transactions(**kwargs)
+        else:
+            self._invalid_blockchain_handler(blockchain)
+
     def create_account(self, blockchain):
         if blockchain == BlockchainType.ETHEREUM:
             return self.ethereum_interaction.create_account()
@@ -93,6 +243,18 @@ class InteractionFunctionality:
         else:
             self._invalid_blockchain_handler(blockchain)
 
+    def watch_only(self, addresses, blockchain, validate=True):
+        # a compact collection of watch-only actors for large address sets
+        return WatchOnlyActors(blockchain=blockchain, addresses=addresses, validate=validate)
+
+    def address_deriver(self, blockchain, **kwargs):
+        if blockchain == BlockchainType.ETHEREUM:
+            return self.ethereum_interaction.address_deriver(**kwargs)
+        elif blockchain == BlockchainType.BITCOIN:
+            return self.bitcoin_interaction.address_deriver(**kwargs)
+        else:
+            self._invalid_blockchain_handler(blockchain)
+
     def make_transaction(self, blockchain, **kwargs):
         if blockchain == BlockchainType.ETHEREUM:
             return self.ethereum_interaction.make_transaction(**kwargs)
@@ -103,17 +265,63 @@ class InteractionFunctionality:
 
 
 class InteractionFunctionalityBitcoin:
-    def __init__(self, **kwargs):
-        self.network = DEFAULT_NETWORK
-        self.service = Service(network=self.network, providers=None, cache_uri=None)
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, cache=None, executor=None, **kwargs):
+        self.max_workers = max_workers
+        self.cache = cache
+        self._local = threading.local()
+        self._network = None
+        self._service = None
+        self._service_lock = threading.Lock()
+        # the bulk lookups run on the same threads every time, so that their Services are made once per thread
+        self.executor = executor or ThreadPoolExecutor(max_workers=max_workers)
+        self.tracker = ConfirmationTracker(lookup=lambda txid: self._call_service('gettransaction', txid))
+
+    @property
+    def network(self):
+        return bitcoinlib_config.DEFAULT_NETWORK if self._network is None else self._network
+
+    @network.setter
+    def network(self, value):
+        self._network = value
+
+    @property
+    def service(self):
+        return self._thread_service()
+
+    @service.setter
+    def service(self, value):
+        # an assigned Service is used by every call instead of the per-thread ones (see _call_service)
+        self._service = value
+
+    def _thread_service(self):
+        # Service keeps the state of the last call on itself, so each worker thread gets its own instance,
+        # made on its first call (and again if the network has been changed since)
+        if self._service is not None:
+            return self._service
+        network = self.network
+        service = getattr(self._local, 'service', None)
+        if service is None or self._local.network != network:
+            service = bitcoinlib_services.Service(network=network, providers=None, cache_uri=None)
+            self._local.service = service
+            self._local.network = network
+        return service
+
+    def _call_service(self, method, *args):
+        # every provider call goes through here: an assigned Service is shared by all the threads,
+        # so its calls are made one at a time
+        service = self._service
+        if service is not None:
+            with self._service_lock:
+                return getattr(service, method)(*args)
+        return getattr(self._thread_service(), method)(*args)
 
     def is_address(self, address):
         if isinstance(address, str):
             if len(address) > 0:
                 try:
-                    _ = Address.parse(address)
+                    _ = bitcoinlib_keys.Address.parse(address)
                     return True
-                except EncodingError as e:
+                except bitcoinlib_encoding.EncodingError as e:
                     return False
             else:
                 return False
@@ -130,111 +338,178 @@ class InteractionFunctionalityBitcoin:
         if isinstance(address, str):
             if len(address) > 0:
                 try:
-                    address = Address.parse(address)
+                    address = bitcoinlib_keys.Address.parse(address)
                     # only p2pkh / p2wpkh addressed derived from compressed public_key are supported
                     # all other formats (including non-compressed p2pkh / p2sh / p2sh-p2wpkh / p2tr) won't be valid here
                     return any([(address.encoding == 'base58') and (address.script_type == 'p2pkh'),
                                 (address.encoding == 'bech32') and (address.script_type == 'p2wpkh')])
-                except EncodingError as e:
+                except bitcoinlib_encoding.EncodingError as e:
                     return False
             else:
                 return False
         else:
             return False
 
+    def validate_addresses(self, addresses):
+        # is_address / is_supported / is_formatted_address / format_address for a whole list at once,
+        # as lists aligned with addresses
+        return bitcoin_address_validator.validate(addresses=addresses)
+
     def is_key_pair(self, private_key, address):
-        try:
-            # only p2pkh / p2wpkh addressed derived from compressed public_key are supported
-            # all other formats (including non-compressed p2pkh / p2sh / p2sh-p2wpkh / p2tr)
-            # might have unexpected behavior here
-            address_parsed = Address.parse(address)
-            witness_type = address_parsed.witness_type
-            encoding = address_parsed.encoding
-            script_type = address_parsed.script_type
-            hdkey = HDKey(private_key, compressed=True, encoding=encoding, witness_type=witness_type)
-            address_derived = hdkey.address(script_type=script_type, encoding=encoding)
-            return address_parsed.address == address_derived
-        except BKeyError as e:
-            return False
-        except EncodingError as e:
-            return False
+        return bitcoin_key_pair(private_key=private_key, address=address)
+
+    def verify_key_pairs(self, pairs, processes=None):
+        # is_key_pair for many (private_key, address) pairs; large batches go to a process pool
+        return verify_key_pairs(blockchain=BlockchainType.BITCOIN, pairs=pairs, processes=processes)
+
+    def _balance(self, address):
+        # bitcoinlib providers sum up the balances of a multi-address getbalance call,
+        # so per-address balances can only be obtained with one call per address
+        balance = self._call_service('_provider_execute', 'getbalance', [address])
+        # TODO: control source libraries for Decimal
+        return Decimal(balance) / Decimal("100_000_000")
 
     def balance(self, addresses):
-        result = {}
-        for address in addresses:
-            balance = self.service._provider_execute('getbalance', [address])
-            # balance = balance / 100_000_000
-            # TODO: control source libraries for Decimal
-            balance = Decimal(balance) / Decimal("100_000_000")
-            result[address] = {'BTC': balance}
+        result, failures = self.balance_bulk(addresses=addresses)
+        if failures:
+            raise next(iter(failures.values()))
         return result
 
-    def get_transactions(self, account, sort='desc', raw=True):
+    def balance_bulk(self, addresses, max_workers=None):
+        addresses = list(addresses)
+        if self.cache is not None:
+            return self.cache.cached_bulk(
+                method='balance', addresses=addresses,
+                fetch=lambda missing: self._balance_bulk(addresses=missing, max_workers=max_workers))
+        else:
+            return self._balance_bulk(addresses=addresses, max_workers=max_workers)
+
+    def _balance_bulk(self, addresses, max_workers=None):
+        balances, failures = bulk_map(function=self._balance, items=addresses,
+                                      max_workers=max_workers or self.max_workers, executor=self.executor)
+        return self._collect_balances(addresses=addresses, balances=balances, failures=failures)
+
+    @staticmethod
+    def _collect_balances(addresses, balances, failures):
+        result = {address: {'BTC': balance} for i, (address, balance) in enumerate(zip(addresses, balances))
+                  if i not in failures}
+        failures = {addresses[i]: failures[i] for i in failures.keys()}
+        return result, failures
+
+    def get_transactions(self, account, sort='desc', raw=True, output='dict'):
+        if self.cache is not None:
+            return self.cache.cached(method='get_transactions', address=account,
+                                     params={'sort': sort, 'raw': raw, 'output': output},
+                                     fetch=lambda: self._get_transactions(account=account, sort=sort, raw=raw,
+                                                                          output=output))
+        else:
+            return self._get_transactions(account=account, sort=sort, raw=raw, output=output)
+
+    def _get_transactions(self, account, sort='desc', raw=True, output='dict'):
 
-        last_txid = ''
-        max_utxos = 100
-        request_results = self.service._provider_execute('gettransactions', account, last_txid,  max_utxos)
+        request_results = list(self.iter_transactions(account=account))
 
         if not raw:
-            results = {'tx': [], 'datetime': [], 'sender': [], 'receiver': [], 'value': [], 'commission_paid': [],
-                       'currency': []}
-            for tx in request_results:
-
-                self_inputs = [x for x in tx.inputs if x.address == account]
-                self_outputs = [x for x in tx.outputs if x.address == account]
-                if len(self_inputs) > 0:
-                    # TODO: control source libraries for Decimal
-                    value = sum([Decimal(x.value) for x in self_inputs]) - sum([Decimal(x.value) for x in self_outputs])
-                    inputs = account
-                    outputs = ';'.join([x.address for x in tx.outputs if x.address != account])
-                else:
-                    # TODO: control source libraries for Decimal
-                    value = sum([Decimal(x.value) for x in self_outputs])
-                    inputs = ';'.join([x.address for x in tx.inputs])
-                    outputs = account
-                tx_hash = tx.txid
-                tx_datetime = tx.date
-                commission = Decimal(tx.fee)
-                currency = 'BTC'
-
-                results['tx'].append(tx_hash)
-                results['datetime'].append(tx_datetime)
-                results['sender'].append(inputs)
-                results['receiver'].append(outputs)
-                results['value'].append(value)
-                results['commission_paid'].append(commission)
-                results['currency'].append(currency)
-
-            results = pandas.DataFrame(data=results)
-            results['value'] = results['value'] / Decimal("100_000_000")
-            results['commission_paid'] = results['commission_paid'] / Decimal("100_000_000")
+            results = bitcoin_frame(txs=request_results, account=account)
             results = results.sort_values(by='datetime', ascending=(not (sort == 'desc')))
-            results = results.to_dict()
-            re = (results, {})
+            re = (format_frame(frame=results, output=output), {})
         else:
             re = (request_results, {})
         return re
 
+    def transaction_page(self, account, last_txid='', page_size=100):
+        return self._call_service('_provider_execute', 'gettransactions', account, last_txid, page_size)
+
+    def iter_transaction_pages(self, account, page_size=100, last_txid=''):
+        # follows last_txid through the whole history (oldest first), one provider call per page
+        while True:
+            txs = self.transaction_page(account=account, last_txid=last_txid, page_size=page_size)
+            if not txs or txs[-1].txid == last_txid:
+                break
+            yield txs
+            last_txid = txs[-1].txid
+
+    def iter_transactions(self, account, page_size=100, last_txid=''):
+        for txs in self.iter_transaction_pages(account=account, page_size=page_size, last_txid=last_txid):
+            for tx in txs:
+                yield tx
+
+    def iter_transactions_many(self, accounts, page_size=100, max_workers=None, max_pages=None):
+        # crawls several accounts concurrently and yields (account, tx) pairs as pages arrive;
+        # at most max_pages fetched pages are kept in memory, the crawlers wait until the consumer catches up
+        accounts = list(accounts)
+        max_workers = max_workers or self.max_workers
+        pages = queue.Queue(maxsize=max_pages or 2 * max_workers)
+        stop = threading.Event()
+        done = object()
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    pages.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def crawl(account):
+            try:
+                for txs in self.iter_transaction_pages(account=account, page_size=page_size):
+                    if not put((account, txs)):
+                        return
+            except Exception as e:
+                put((account, e))
+            else:
+                put((account, done))
+
+        executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(accounts) or 1)))
+        try:
+            for account in accounts:
+                executor.submit(crawl, account)
+            remaining = len(accounts)
+            while remaining:
+                account, txs = pages.get()
+                if txs is done:
+                    remaining -= 1
+                elif isinstance(txs, Exception):
+                    raise txs
+                else:
+                    for tx in txs:
+                        yield account, tx
+        finally:
+            stop.set()
+            executor.shutdown(wait=True)
+
     def create_account(self):
-        hdkey = HDKey()
+        hdkey = bitcoinlib_keys.HDKey()
         private_key = hdkey.private_hex
         # by default, we generate native segwit only (p2wpkh addresses)
         actor = Actor(blockchain=BlockchainType.BITCOIN, private_key=private_key, script_type='p2wpkh')
         return actor
 
+    def address_deriver(self, seed=None, mnemonic=None, xpub=None, purpose=None, account=0, passphrase=''):
+        # bulk watch-only addresses: BIP84 (p2wpkh) by default, BIP44 (p2pkh) with purpose=44
+        return AddressDeriver(blockchain=BlockchainType.BITCOIN, seed=seed, mnemonic=mnemonic, xpub=xpub,
+                              purpose=purpose, account=account, passphrase=passphrase, network=self.network)
+
+    def confirmation(self, txid):
+        # a Future resolving to {'txid', 'status', 'confirmations', 'error'} once the transaction is found
+        # in the blockchain ('sent') or the tracker gives up on it ('not_sent')
+        return self.tracker.track(txid=txid)
+
     def make_transaction(self, sender, receiver, value=None, gas=None, **kwargs):
 
         value = '{0} BTC'.format(value)
 
         private_hex = sender.private_key
-        from_address = Address.parse(sender.address)
+        from_address = bitcoinlib_keys.Address.parse(sender.address)
         witness_type = from_address.witness_type
         encoding = from_address.encoding
         script_type = from_address.script_type
-        hdkey = HDKey(private_hex, compressed=True, encoding=encoding, witness_type=witness_type)
+        hdkey = bitcoinlib_keys.HDKey(private_hex, compressed=True, encoding=encoding, witness_type=witness_type)
         _ = hdkey.address(script_type=script_type, encoding=encoding)
-        kk = Transactor(address=hdkey.address(), hdkey=hdkey)
-        address_to = Address.parse(receiver.address)
+        kk = oaiv_btc_func.Transactor(address=hdkey.address(), hdkey=hdkey)
+        address_to = bitcoinlib_keys.Address.parse(receiver.address)
 
         # TODO: control source libraries for Decimal
         if gas:
@@ -242,180 +517,304 @@ class InteractionFunctionalityBitcoin:
         else:
             tx = kk.send_to(address_to, value, offline=False)
 
-        # TODO: consider optimizing this behavior
+        # the providers may report an error for a transaction which still reaches the blockchain,
+        # so its fate is checked in the background instead of blocking the caller
         if tx.error is not None:
-            time.sleep(1)
-            tx_check = self.service.gettransaction(tx.txid)
-            if not tx_check:
-                time.sleep(5)
-                tx_check = self.service.gettransaction(tx.txid)
-                if not tx_check:
-                    if not tx_check:
-                        print(tx.info())
-                        raise Exception("Unexpected error. Transaction {0} is not sent to the blockchain\n"
-                                        "Error message:\n{1}".format(tx.txid, tx.error))
-                else:
-                    print(tx.info())
-                    print(
-                        "Transaction is sent to the blockchain, "
-                        "however an unexpected response received from the providers\n"
-                        "Response message:\n{0}".format(tx.error))
-            else:
-                print(tx.info())
-                print(
-                    "Transaction is sent to the blockchain, "
-                    "however an unexpected response received from the providers\n"
-                    "Response message:\n{0}".format(tx.error))
+            logger.warning("Transaction %s: an unexpected response received from the providers\n"
+                           "Response message:\n%s", tx.txid, tx.error)
+            self.tracker.track(txid=tx.txid, error=tx.error)
         tx_id = tx.txid
 
+        if self.cache is not None:
+            self.cache.invalidate(address=sender.address)
+            self.cache.invalidate(address=receiver.address)
+
         return tx_id
 
 
 class InteractionFunctionalityEthereum:
-    def __init__(self, etherscan_api_key, ethplorer_api_key, ethereum_network, infura_project_id):
+    # w3 and the Infura client are only made on first use: the balances and the transactions
+    # come from Etherscan / Ethplorer, and the address checks need eth_utils only
+    def __init__(self, etherscan_api_key, ethplorer_api_key, ethereum_network, infura_project_id,
+                 max_workers=DEFAULT_MAX_WORKERS, etherscan_rate_limit=5, ethplorer_rate_limit=2, transport=None,
+                 cache=None, token_registry=None, nonce_manager=None, gas_oracle=None):
         self.network = ethereum_network
+        self.cache = cache
         self.etherscan_api_key = etherscan_api_key
         self.ethplorer_api_key = ethplorer_api_key
+        # one connection pool for Etherscan, Ethplorer and Infura
+        self.transport = transport or HTTPTransport(pool_maxsize=max_workers)
         self.provider = format_provider(
             ethereum_network=ethereum_network,
             infura_project_id=infura_project_id
         )
-        self.w3 = format_w3(provider=self.provider)
+        self.infura_kwg = {'token_registry': token_registry, 'nonce_manager': nonce_manager,
+                           'gas_oracle': gas_oracle}
+        self._w3 = None
+        self._infura = None
+        self._balance_engine = None
+        # reentrant, as making the Infura client makes w3 as well
+        self._lock = threading.RLock()
 
         self.etherscan = EtherscanInteraction(
             network=ethereum_network,
-            etherscan_api_key=etherscan_api_key
+            etherscan_api_key=etherscan_api_key,
+            max_workers=max_workers,
+            rate_limit=etherscan_rate_limit,
+            transport=self.transport
         )
         self.ethplorer = EthplorerInteraction(
-            ethplorer_api_key=ethplorer_api_key
+            ethplorer_api_key=ethplorer_api_key,
+            max_workers=max_workers,
+            rate_limit=ethplorer_rate_limit,
+            transport=self.transport
         )
-        self.infura = InfuraInteraction(w3=self.w3)
+
+    def _make_w3(self):
+        return format_w3(provider=self.provider, transport=self.transport)
+
+    def _make_infura(self):
+        return InfuraInteraction(w3=self.w3, transport=self.transport, **self.infura_kwg)
+
+    def _make_balance_engine(self):
+        return BalanceMatrix(w3=self.w3, token_registry=self.infura_kwg['token_registry'], transport=self.transport)
+
+    @property
+    def w3(self):
+        if self._w3 is None:
+            with self._lock:
+                if self._w3 is None:
+                    self._w3 = self._make_w3()
+        return self._w3
+
+    @w3.setter
+    def w3(self, value):
+        self._w3 = value
+
+    @property
+    def infura(self):
+        if self._infura is None:
+            with self._lock:
+                if self._infura is None:
+                    self._infura = self._make_infura()
+        return self._infura
+
+    @infura.setter
+    def infura(self, value):
+        self._infura = value
+
+    @property
+    def balance_engine(self):
+        if self._balance_engine is None:
+            with self._lock:
+                if self._balance_engine is None:
+                    self._balance_engine = self._make_balance_engine()
+        return self._balance_engine
 
     def is_address(self, address):
-        return self.w3.is_address(value=address)
+        return eth_utils.is_address(value=address)
 
     def is_formatted_address(self, address):
-        return self.w3.is_checksum_address(value=address)
+        return eth_utils.is_checksum_address(value=address)
 
     def format_address(self, address):
-        return self.w3.to_checksum_address(value=address)
+        return eth_utils.to_checksum_address(value=address)
 
     def is_supported(self, address):
-        return self.w3.is_address(value=address)
+        return eth_utils.is_address(value=address)
+
+    def validate_addresses(self, addresses):
+        return ethereum_address_validator.validate(addresses=addresses)
 
     def is_key_pair(self, private_key, address):
-        try:
-            message = encode_defunct(text='In memoriam of Ivanov O.A.')
-            txx = self.w3.eth.account.sign_message(message, private_key=private_key)
-            recovered = self.w3.eth.account.recover_message(message, signature=txx.signature)
-            result = recovered == address
-            return result
-        except Exception as e:
-            print(e)
-            return False
+        return ethereum_key_pair(private_key=private_key, address=address)
+
+    def verify_key_pairs(self, pairs, processes=None):
+        return verify_key_pairs(blockchain=BlockchainType.ETHEREUM, pairs=pairs, processes=processes)
 
     def balance(self, addresses):
-        addresses = [self.w3.toChecksumAddress(value=address) for address in addresses]
+        result, failures = self.balance_bulk(addresses=addresses)
+        if failures:
+            raise next(iter(failures.values()))
+        return result
 
-        etherscan_result = self.etherscan.balance(addresses=addresses)
-        ethplorer_result = self.ethplorer.balance(addresses=addresses)
+    def balance_bulk(self, addresses):
+        addresses = [eth_utils.to_checksum_address(value=address) for address in addresses]
+        if self.cache is not None:
+            return self.cache.cached_bulk(method='balance', addresses=addresses, fetch=self._balance_bulk)
+        else:
+            return self._balance_bulk(addresses=addresses)
+
+    def _balance_bulk(self, addresses):
+        return self._merge_balances(addresses=addresses,
+                                    etherscan=self.etherscan.balance_bulk(addresses=addresses),
+                                    ethplorer=self.ethplorer.balance_bulk(addresses=addresses))
+
+    def _merge_balances(self, addresses, etherscan, ethplorer):
+        (etherscan_result, etherscan_failures), (ethplorer_result, ethplorer_failures) = etherscan, ethplorer
 
-        etherscan_result = {self.w3.toChecksumAddress(value=key): etherscan_result[key]
+        etherscan_result = {eth_utils.to_checksum_address(value=key): etherscan_result[key]
                             for key in etherscan_result.keys()}
-        ethplorer_result = {self.w3.toChecksumAddress(value=key): ethplorer_result[key]
+        ethplorer_result = {eth_utils.to_checksum_address(value=key): ethplorer_result[key]
                             for key in ethplorer_result.keys()}
+        failures = {eth_utils.to_checksum_address(value=key): value
+                    for key, value in {**ethplorer_failures, **etherscan_failures}.items()}
 
-        keys = list(etherscan_result.keys())
-        keys += [x for x in ethplorer_result.keys() if x not in keys]
-
-        result = dict(etherscan_result)
+        result = {address: dict(etherscan_result.get(address, {})) for address in addresses
+                  if address in etherscan_result or address in ethplorer_result}
         for address in ethplorer_result.keys():
             for currency in ethplorer_result[address].keys():
-                result[address][currency] = ethplorer_result[address][currency]
-
-        return result
+                result.setdefault(address, {})[currency] = ethplorer_result[address][currency]
+
+        return result, failures
+
+    def balance_matrix(self, addresses, currencies=None, block_identifier=None):
+        # an on-chain counterpart of balance_bulk: ETH and token balances of all the addresses are read through w3
+        # in a few Multicall eth_calls at one block; the result is {'block', 'balances', 'failures'}
+        addresses = [eth_utils.to_checksum_address(value=address) for address in addresses]
+        return self.balance_engine.snapshot(addresses=addresses, currencies=currencies,
+                                            block_identifier=block_identifier)
+
+    def get_transactions(self, account, **kwargs):
+        if self.cache is not None:
+            return self.cache.cached(method='get_transactions', address=eth_utils.to_checksum_address(value=account),
+                                     params=kwargs,
+                                     fetch=lambda: self.etherscan.get_transactions(account=account, **kwargs))
+        else:
+            return self.etherscan.get_transactions(account=account, **kwargs)
 
-    def get_transactions(self, **kwargs):
-        return self.etherscan.get_transactions(**kwargs)
+    def iter_transactions(self, account, **kwargs):
+        return self.etherscan.iter_transactions(account=account, **kwargs)
 
     def create_account(self):
         return self.infura.create_account()
 
-    def make_transaction(self, **kwargs):
-        return self.infura.make_transaction(**kwargs)
+    def address_deriver(self, seed=None, mnemonic=None, xpub=None, account=0, passphrase=''):
+        # bulk watch-only addresses along m/44'/60'/account'/0/index
+        return AddressDeriver(blockchain=BlockchainType.ETHEREUM, seed=seed, mnemonic=mnemonic, xpub=xpub,
+                              account=account, passphrase=passphrase)
+
+    def make_transaction(self, sender, receiver, **kwargs):
+        tx_id = self.infura.make_transaction(sender=sender, receiver=receiver, **kwargs)
+        if self.cache is not None:
+            self.cache.invalidate(address=sender.address)
+            self.cache.invalidate(address=receiver.address)
+        return tx_id
+
+    def make_transactions(self, transfers):
+        transfers = list(transfers)
+        results = self.infura.make_transactions(transfers=transfers)
+        if self.cache is not None:
+            for transfer, result in zip(transfers, results):
+                if result['tx_id'] is not None:
+                    self.cache.invalidate(address=transfer['sender'].address)
+                    self.cache.invalidate(address=transfer['receiver'].address)
+        return results
 
 
 class EthplorerInteraction:
-    def __init__(self, ethplorer_api_key):
+    def __init__(self, ethplorer_api_key, max_workers=DEFAULT_MAX_WORKERS, rate_limit=2, transport=None):
         self.ethplorer_api_key = ethplorer_api_key
+        self.max_workers = max_workers
+        self.transport = transport or HTTPTransport(pool_maxsize=max_workers)
+        # calls per second allowed by the api key plan (2 for the free one)
+        self.rate_limiter = RateLimiter(calls=rate_limit, period=1.0)
 
-    def request(self, method, params, kwargs):
+    def _request_args(self, method, params, kwargs):
         url = 'https://api.ethplorer.io/'
         if method in ['getAddressInfo']:
             url += 'getAddressInfo/{address}'
         else:
             raise KeyError("Invalid `method` keyword: 'getAddressInfo' is only valid, '{0}' value provided".format(
                 method))
+        params = dict(params)
         params['apiKey'] = self.ethplorer_api_key
+        return url.format(**kwargs), params
 
-        query = parse.urlencode(params)
-        url = '{0}?{1}'.format(url, query)
-        url = url.format(**kwargs)
-        with request.urlopen(url) as response:
-            response_data = json.loads(response.read())
+    def request(self, method, params, kwargs):
+        url, params = self._request_args(method=method, params=params, kwargs=kwargs)
 
-        return response_data
+        self.rate_limiter.acquire()
+        response_data = self.transport.get_json(url=url, params=params)
 
-    def balance(self, addresses):
+        return response_data
 
-        results = {}
+    def _balance(self, address):
+        response_data = self.request(method='getAddressInfo', params={}, kwargs={'address': address})
+        return self._parse_balance(response_data=response_data)
 
-        # """
-        params = {}
+    @staticmethod
+    def _parse_balance(response_data):
+        if 'tokens' in response_data.keys():
+            result = {}
+            for token in response_data['tokens']:
+                # TODO: control source libraries for Decimal
+                result[token['tokenInfo']['symbol']] = \
+                    Decimal(token['balance']) / Decimal('10') ** Decimal(token['tokenInfo']['decimals'])
+            return response_data['address'], result
+        else:
+            return None
 
-        for address in addresses:
+    def balance(self, addresses):
+        results, failures = self.balance_bulk(addresses=addresses)
+        if failures:
+            raise next(iter(failures.values()))
+        return results
 
-            response_data = self.request(method='getAddressInfo', params=params, kwargs={'address': address})
+    def balance_bulk(self, addresses, max_workers=None):
+        # addresses are requested concurrently; the results keep the input order,
+        # and a failed address is reported in failures instead of aborting the whole batch
+        addresses = list(addresses)
+        responses, failures = bulk_map(function=self._balance, items=addresses,
+                                       max_workers=max_workers or self.max_workers)
+        return self._collect_balances(addresses=addresses, responses=responses, failures=failures)
 
-            if 'tokens' in response_data.keys():
-                results[response_data['address']] = {}
-                for i, token in enumerate(response_data['tokens']):
-                    # TODO: control source libraries for Decimal
-                    results[response_data['address']][response_data['tokens'][i]['tokenInfo']['symbol']] = \
-                        Decimal(response_data['tokens'][i]['balance']) / Decimal('10') ** Decimal(
-                        response_data['tokens'][i]['tokenInfo']['decimals'])
+    @staticmethod
+    def _collect_balances(addresses, responses, failures):
+        results = {}
+        for response in responses:
+            if response is not None:
+                address, tokens = response
+                results[address] = tokens
+        failures = {addresses[i]: failures[i] for i in failures.keys()}
 
-        return results
+        return results, failures
 
 
 class EtherscanInteraction:
-    def __init__(self, network, etherscan_api_key):
+    # balancemulti accepts at most 20 addresses per call
+    balancemulti_limit = 20
+
+    def __init__(self, network, etherscan_api_key, max_workers=DEFAULT_MAX_WORKERS, rate_limit=5, transport=None):
         self.network = network
         self.etherscan_api_key = etherscan_api_key
+        self.max_workers = max_workers
+        self.transport = transport or HTTPTransport(pool_maxsize=max_workers)
+        # calls per second allowed by the api key plan (5 for the free one)
+        self.rate_limiter = RateLimiter(calls=rate_limit, period=1.0)
 
-    def request(self, params):
+    @property
+    def url(self):
         network = {
             'mainnet': 'https://api.etherscan.io/api',
             'goerli': 'https://api-goerli.etherscan.io/api',
             'ropsten': 'https://api-ropsten.etherscan.io/api'
         }
         try:
-            url = network[self.network]
+            return network[self.network]
         except KeyError:
             raise KeyError("Invalid network name")
-        
-        query = parse.urlencode(params)
-        url = '{0}?{1}'.format(url, query)
-        with request.urlopen(url) as response:
-            response_data = json.loads(response.read())
 
-        return response_data
+    def request(self, params):
+        url = self.url
 
-    def balance(self, addresses):
+        self.rate_limiter.acquire()
+        response_data = self.transport.get_json(url=url, params=params)
 
-        results = {}
+        return response_data
 
-        params = {
+    def _balance_params(self, addresses):
+        return {
             'module': 'account',
             'action': 'balancemulti',
             'address': ','.join(addresses),
@@ -423,48 +822,131 @@ class EtherscanInteraction:
             'apikey': self.etherscan_api_key,
         }
 
-        response_data = self.request(params=params)
+    def _balance(self, addresses):
+        response_data = self.request(params=self._balance_params(addresses=addresses))
+        return self._parse_balance(response_data=response_data)
+
+    @staticmethod
+    def _parse_balance(response_data):
+        if response_data['status'] != '1':
+            raise Exception("Etherscan balancemulti request failed: {0}; {1}".format(
+                response_data['message'], response_data['result']))
 
         # TODO: control source libraries for Decimal
-        for i, account in enumerate(addresses):
-            results[account] = {'ETH': Decimal(response_data['result'][i]['balance']) / Decimal('10') ** Decimal('18')}
+        return {eth_utils.to_checksum_address(item['account']):
+                {'ETH': Decimal(item['balance']) / Decimal('10') ** Decimal('18')}
+                for item in response_data['result']}
 
+    def balance(self, addresses):
+        results, failures = self.balance_bulk(addresses=addresses)
+        if failures:
+            raise next(iter(failures.values()))
         return results
 
-    def get_transactions(self, account, sort='desc', raw=True):
-        re = tuple()
-        params = {
+    def balance_bulk(self, addresses, max_workers=None):
+        # addresses are split into balancemulti-sized chunks which are requested concurrently under the rate limit;
+        # a failed chunk is reported in failures for each of its addresses
+        chunks = chunked(items=addresses, size=self.balancemulti_limit)
+        responses, failures = bulk_map(function=self._balance, items=chunks,
+                                       max_workers=max_workers or self.max_workers)
+        return self._collect_balances(chunks=chunks, responses=responses, failures=failures)
+
+    @staticmethod
+    def _collect_balances(chunks, responses, failures):
+        results = {}
+        for response in responses:
+            if response is not None:
+                results.update(response)
+        failures = {address: failures[i] for i in failures.keys() for address in chunks[i]}
+
+        return results, failures
+
+    def iter_transactions(self, account, action='txlist', page_size=1000, batch_size=None, cursor=None,
+                          endblock=99999999):
+        # pages through the history in ascending order by moving the startblock window forward,
+        # yielding records one by one (or lists of batch_size records) as they arrive;
+        # cursor is advanced on every yield, so the same cursor can be passed again to resume the crawl
+        cursor = cursor or EtherscanCursor(action=action)
+        # position tracks what has been fetched, while cursor tracks what has been delivered
+        position = EtherscanCursor(action=cursor.action, startblock=cursor.startblock, seen=cursor.seen)
+        window = cursor.startblock
+        page = 1
+        batch = []
+        while True:
+            params = self._page_params(account=account, action=cursor.action, window=window, endblock=endblock,
+                                       page=page, page_size=page_size)
+            records = self._page_records(response_data=self.request(params=params), action=cursor.action)
+
+            for record in self._new_records(records=records, position=position):
+                if batch_size:
+                    batch.append(record)
+                    if len(batch) == batch_size:
+                        cursor.advance(batch)
+                        yield batch
+                        batch = []
+                else:
+                    cursor.advance([record])
+                    yield record
+
+            if len(records) < page_size:
+                break
+            window, page = self._next_page(records=records, window=window, page=page)
+
+        if batch:
+            cursor.advance(batch)
+            yield batch
+
+    def _page_params(self, account, action, window, endblock, page, page_size):
+        return {
             'module': 'account',
-            'action': 'txlist',
+            'action': action,
             'address': account,
-            'startblock': 0,  # check numbers
-            'endblock': 99999999,  # TODO: check numbers
-            # 'page': 1,
-            # 'offset': 10,
-            'sort': sort,
+            'startblock': window,
+            'endblock': endblock,
+            'page': page,
+            'offset': page_size,
+            'sort': 'asc',
             'apikey': self.etherscan_api_key,
         }
-        response_data_eth = self.request(params)
-        if not raw:
-            results_eth = {'tx': [], 'datetime': [], 'sender': [], 'receiver': [], 'value': [],
-                           'commission_paid': [], 'currency': []}
-            for item in response_data_eth['result']:
-                results_eth['tx'].append(item['hash'])
-                results_eth['datetime'].append(datetime.datetime.fromtimestamp(int(item['timeStamp'])))
-                results_eth['sender'].append(item['from'])
-                results_eth['receiver'].append(item['to'])
-                # TODO: control source libraries for Decimal
-                results_eth['value'].append(Web3.from_wei(number=Decimal(item['value']), unit='ether'))
-                results_eth['commission_paid'].append(Web3.from_wei(number=(Decimal(item['gasPrice']) *
-                                                                            Decimal(item['gasUsed'])),
-                                                                   unit='ether'))
-                results_eth['currency'].append('ETH')
-            re += (results_eth,)
-        else:
-            re += (response_data_eth,)
-        params = {
+
+    @staticmethod
+    def _page_records(response_data, action):
+        if response_data['status'] == '1':
+            return response_data['result']
+        elif response_data['message'] == 'No transactions found':
+            return []
+        else:
+            raise Exception("Etherscan {0} request failed: {1}; {2}".format(
+                action, response_data['message'], response_data['result']))
+
+    @staticmethod
+    def _new_records(records, position):
+        # skips what has already been fetched and moves the position past the rest; every record delivered
+        # carries its key, as identical transfers are only told apart by their order within the page
+        for record, key in zip(records, EtherscanCursor.record_keys(records=records)):
+            block = int(record['blockNumber'])
+            if block < position.startblock or (block == position.startblock and key in position.seen):
+                continue
+            record[EtherscanCursor.key_field] = key
+            position.advance([record])
+            yield record
+
+    @staticmethod
+    def _next_page(records, window, page):
+        last_block = int(records[-1]['blockNumber'])
+        if last_block == int(records[0]['blockNumber']):
+            # the whole page belongs to a single block, so the window cannot move; take the next page of it
+            return window, page + 1
+        else:
+            return last_block, 1
+
+    def _request_transactions(self, account, action, sort):
+        return self.request(self._transactions_params(account=account, action=action, sort=sort))
+
+    def _transactions_params(self, account, action, sort):
+        return {
             'module': 'account',
-            'action': 'tokentx',
+            'action': action,
             'address': account,
             # &contractaddress=0x9f8f72aa9304c8b593d555f12ef6589cc3a579a2  # we can use this arg to filter by spec token
             'startblock': 0,  # check numbers
@@ -474,26 +956,118 @@ class EtherscanInteraction:
             'sort': sort,
             'apikey': self.etherscan_api_key,
         }
-        response_data_erc20 = self.request(params)
-        if not raw:
-            results_erc20 = {'tx': [], 'datetime': [], 'sender': [], 'receiver': [], 'value': [],
-                             'commission_paid': [], 'currency': []}
-            for item in response_data_erc20['result']:
-                results_erc20['tx'].append(item['hash'])
-                results_erc20['datetime'].append(datetime.datetime.fromtimestamp(int(item['timeStamp'])))
-                results_erc20['sender'].append(item['from'])
-                results_erc20['receiver'].append(item['to'])
-                # TODO: control source libraries for Decimal
-                results_erc20['value'].append(Decimal(item['value']) / (Decimal('10') ** Decimal(item['tokenDecimal'])))
-                results_erc20['commission_paid'].append(Web3.from_wei(number=(Decimal(item['gasPrice']) *
-                                                                              Decimal(item['gasUsed'])),
-                                                                      unit='ether'))
-                results_erc20['currency'].append(item['tokenSymbol'])
-            re += (results_erc20,)
-        else:
-            re += (response_data_erc20,)
+
+    def get_transactions(self, account, sort='desc', raw=True, output='dict', internal=False, merge=False):
+        # txlist, tokentx (and txlistinternal if internal) are requested concurrently;
+        # with raw=False the results are normalized column-wise and returned as dicts of lists (output='dict'),
+        # pandas DataFrames (output='frame') or pyarrow Tables (output='arrow');
+        # with merge=True one stream ordered by time is returned instead of a tuple per endpoint
+        actions = self._transaction_actions(internal=internal)
+        responses, failures = bulk_map(
+            function=lambda action: self._request_transactions(account=account, action=action, sort=sort),
+            items=actions, max_workers=len(actions))
+        if failures:
+            raise next(iter(failures.values()))
+        return self._format_transactions(actions=actions, responses=responses, sort=sort, raw=raw, output=output,
+                                         merge=merge)
+
+    @staticmethod
+    def _transaction_actions(internal):
+        return ['txlist', 'tokentx'] + (['txlistinternal'] if internal else [])
+
+    def _format_transactions(self, actions, responses, sort, raw, output, merge):
+        if merge:
+            return self._merge_transactions(actions=actions, responses=responses, sort=sort, raw=raw, output=output)
+
+        re = tuple()
+        for action, response_data in zip(actions, responses):
+            if not raw:
+                # a failed endpoint raises here, as in the merged history, instead of failing in the normalization
+                records = self._page_records(response_data=response_data, action=action)
+                re += (format_frame(frame=etherscan_frame(records=records, action=action),
+                                    output=output, orient='list'),)
+            else:
+                re += (response_data,)
         return re
 
+    @staticmethod
+    def _merge_transactions(actions, responses, sort, raw, output):
+        # every endpoint is already sorted by Etherscan, so the streams are k-way merged instead of re-sorted;
+        # a failed endpoint raises rather than leaving a gap in the merged history
+        sources = [EtherscanInteraction._page_records(response_data=response_data, action=action)
+                   for action, response_data in zip(actions, responses)]
+        order = heapq.merge(*[[(int(record['timeStamp']), i, j) for j, record in enumerate(records)]
+                              for i, records in enumerate(sources)],
+                            reverse=(sort == 'desc'))
+
+        if raw:
+            merged = []
+            for _, i, j in order:
+                record = sources[i][j]
+                record['action'] = actions[i]
+                merged.append(record)
+            return merged
+        else:
+            frames = [etherscan_frame(records=records, action=action) for action, records in zip(actions, sources)]
+            offsets = [0]
+            for frame in frames[:-1]:
+                offsets.append(offsets[-1] + len(frame))
+            merged = pandas.concat([frame for frame in frames if len(frame)] or frames[:1], ignore_index=True)
+            merged = merged.take([offsets[i] + j for _, i, j in order]).reset_index(drop=True)
+            return format_frame(frame=merged, output=output, orient='list')
+
+
+class EtherscanCursor:
+    # position of a paginated Etherscan crawl: the block to continue from and the records of that block
+    # which were already delivered; it can be stored with to_dict and restored with from_dict to resume a crawl
+    # field of the records delivered by iter_transactions which holds their key
+    key_field = 'recordKey'
+
+    def __init__(self, action='txlist', startblock=0, seen=None):
+        self.action = action
+        self.startblock = startblock
+        self.seen = set(seen or [])
+
+    @staticmethod
+    def record_key(record, occurrence=0):
+        # tokentx records have no logIndex, so the transfers of one transaction (a swap, a multi-send)
+        # are told apart by their token, parties and value, and identical ones by their occurrence
+        if record.get('logIndex', '') != '':
+            key = '{0}:{1}:{2}'.format(record['hash'], record['logIndex'], record.get('traceId', ''))
+        else:
+            key = '{0}:{1}:{2}:{3}:{4}:{5}'.format(record['hash'], record.get('contractAddress', ''),
+                                                   record.get('from', ''), record.get('to', ''),
+                                                   record.get('value', ''), record.get('traceId', ''))
+        return '{0}:{1}'.format(key, occurrence) if occurrence else key
+
+    @staticmethod
+    def record_keys(records):
+        # keys of records in Etherscan order, the n-th repetition of a record getting occurrence n; a page always
+        # starts at the beginning of a block (unless a single block fills several pages), so the occurrences
+        # are the same every time the block is fetched
+        keys = []
+        occurrences = {}
+        for record in records:
+            key = EtherscanCursor.record_key(record=record)
+            keys.append(EtherscanCursor.record_key(record=record, occurrence=occurrences.get(key, 0)))
+            occurrences[key] = occurrences.get(key, 0) + 1
+        return keys
+
+    def advance(self, records):
+        for record in records:
+            block = int(record['blockNumber'])
+            if block > self.startblock:
+                self.startblock = block
+                self.seen = set()
+            self.seen.add(record.get(self.key_field) or self.record_key(record=record))
+
+    def to_dict(self):
+        return {'action': self.action, 'startblock': self.startblock, 'seen': sorted(self.seen)}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(action=data['action'], startblock=data['startblock'], seen=data['seen'])
+
 
 class Actor:
     def __init__(self, blockchain, **kwargs):
@@ -526,7 +1100,7 @@ class ActorBitcoin:
         elif private_key:
             self.private_key = private_key
             # we support only (compressed; p2pkh; base58) and (compressed; p2wpkh; bech32) addresses
-            hdkey = HDKey(private_key)
+            hdkey = bitcoinlib_keys.HDKey(private_key)
             if script_type == 'p2pkh':
                 self._address = hdkey.address(script_type=script_type, encoding='base58')
             elif script_type == 'p2wpkh':
@@ -547,12 +1121,12 @@ class ActorBitcoin:
         if isinstance(address, str):
             if len(address) > 0:
                 try:
-                    address = Address.parse(address)
+                    address = bitcoinlib_keys.Address.parse(address)
                     # only p2pkh / p2wpkh addressed derived from compressed public_key are supported
                     # all other formats (including non-compressed p2pkh / p2sh / p2sh-p2wpkh / p2tr) won't be valid here
                     return any([(address.encoding == 'base58') and (address.script_type == 'p2pkh'),
                                 (address.encoding == 'bech32') and (address.script_type == 'p2wpkh')])
-                except EncodingError as e:
+                except bitcoinlib_encoding.EncodingError as e:
                     return False
             else:
                 return False
@@ -560,21 +1134,7 @@ class ActorBitcoin:
             return False
 
     def is_key_pair(self, private_key, address):
-        try:
-            # only p2pkh / p2wpkh addressed derived from compressed public_key are supported
-            # all other formats (including non-compressed p2pkh / p2sh / p2sh-p2wpkh / p2tr)
-            # might have unexpected behavior here
-            address_parsed = Address.parse(address)
-            witness_type = address_parsed.witness_type
-            encoding = address_parsed.encoding
-            script_type = address_parsed.script_type
-            hdkey = HDKey(private_key, compressed=True, encoding=encoding, witness_type=witness_type)
-            address_derived = hdkey.address(script_type=script_type, encoding=encoding)
-            return address_parsed.address == address_derived
-        except BKeyError as e:
-            return False
-        except EncodingError as e:
-            return False
+        return bitcoin_key_pair(private_key=private_key, address=address)
 
     @property
     def address(self):
@@ -640,8 +1200,15 @@ class ActorEthereum:
 
 
 class InfuraInteraction:
-    def __init__(self, w3):
+    # JSON-RPC batches are split into requests of this many calls
+    rpc_batch_limit = 100
+
+    def __init__(self, w3, token_registry=None, nonce_manager=None, transport=None, gas_oracle=None):
         self.w3 = w3
+        self.token_registry = token_registry or default_token_registry
+        self.nonce_manager = nonce_manager or NonceManager(w3=w3)
+        self.transport = transport or HTTPTransport()
+        self.gas_oracle = gas_oracle or GasOracle(w3=w3)
 
     # TODO: add mnemonic support (see the w3.eth.account docs)
     def create_account(self):
@@ -649,7 +1216,7 @@ class InfuraInteraction:
         actor = Actor(blockchain=BlockchainType.ETHEREUM, w3=self.w3, private_key=private_key)
         return actor
 
-    def generate_transaction_data(self, sender, receiver, value=None, currency=None, gas=None):
+    def _transaction_body(self, sender, receiver, value=None, currency=None):
         tx = {
             'from': sender.address,
             'to': receiver.address,
@@ -660,25 +1227,111 @@ class InfuraInteraction:
             if currency == 'ETH':
                 tx['value'] = self.w3.to_wei(value, 'ether')
             else:
-                token_contract_address = find_address(name=currency)
-                contract = Actor(blockchain=BlockchainType.ETHEREUM, w3=self.w3, private_key=None, address=token_contract_address)
-                tx['to'] = contract.address
-                tx['data'] = data_constructor(w3=self.w3, receiver_address=receiver.address, amount=value, currency=currency)
+                tx['to'] = self.token_registry.contract(symbol=currency)
+                tx['data'] = data_constructor(w3=self.w3, receiver_address=receiver.address, amount=value,
+                                              currency=currency, registry=self.token_registry)
+
+        return tx
+
+    def generate_transaction_data(self, sender, receiver, value=None, currency=None, gas=None, nonce=None):
+        tx = self._transaction_body(sender=sender, receiver=receiver, value=value, currency=currency)
 
-        # TODO: improve gas calculations with pre-London and post-London versions
         if gas:
             gas = Decimal(gas)
             tx['gas'] = gas
         else:
             tx['gas'] = self.w3.eth.estimate_gas(tx)
 
-        tx['gasPrice'] = self.w3.eth.gas_price
-        tx['nonce'] = sender.nonce
+        # EIP-1559 fee fields on post-London chains, a legacy gasPrice otherwise
+        self.gas_oracle.apply(tx)
+        tx['nonce'] = sender.nonce if nonce is None else nonce
 
         return tx
 
     def make_transaction(self, sender, receiver, value=None, currency=None, gas=None, **kwargs):
-        tx = self.generate_transaction_data(sender=sender, receiver=receiver, value=value, currency=currency, gas=gas)
-        signed_txn = sender.sign_transaction(tx)
-        tx_id = self.w3.to_hex(self.w3.eth.send_raw_transaction(signed_txn.rawTransaction))
+        nonce = self.nonce_manager.reserve(address=sender.address)
+        try:
+            tx = self.generate_transaction_data(sender=sender, receiver=receiver, value=value, currency=currency,
+                                                gas=gas, nonce=nonce)
+            signed_txn = sender.sign_transaction(tx)
+            tx_id = self.w3.to_hex(self.w3.eth.send_raw_transaction(signed_txn.rawTransaction))
+        except Exception:
+            self.nonce_manager.release(address=sender.address, nonce=nonce)
+            self.nonce_manager.resync(address=sender.address)
+            raise
+        self.nonce_manager.confirm(address=sender.address, nonce=nonce)
         return tx_id
+
+    def _rpc_batch(self, calls):
+        responses = []
+        for chunk in chunked(items=calls, size=self.rpc_batch_limit):
+            responses += self.transport.rpc_batch(url=self.w3.provider.endpoint_uri, calls=chunk)
+        return responses
+
+    def make_transactions(self, transfers):
+        # transfers are dicts with the make_transaction keywords (sender, receiver, value, currency, gas);
+        # the fees come from the shared gas oracle, gas estimates and raw transactions go in JSON-RPC batches, and the result
+        # holds {'tx_id': ..., 'error': ...} for every transfer in the input order
+        transfers = list(transfers)
+        results = [{'tx_id': None, 'error': None} for _ in transfers]
+
+        txs = {}
+        for i, transfer in enumerate(transfers):
+            try:
+                txs[i] = self._transaction_body(sender=transfer['sender'], receiver=transfer['receiver'],
+                                                value=transfer.get('value'), currency=transfer.get('currency'))
+                if transfer.get('gas'):
+                    txs[i]['gas'] = int(transfer['gas'])
+            except Exception as e:
+                results[i]['error'] = e
+
+        to_estimate = [i for i in txs.keys() if 'gas' not in txs[i]]
+        calls = [('eth_estimateGas', [{key: (hex(value) if isinstance(value, int) else value)
+                                       for key, value in txs[i].items()}])
+                 for i in to_estimate]
+        try:
+            responses = self._rpc_batch(calls=calls)
+        except Exception as e:
+            responses = [{'error': e}] * len(to_estimate)
+        for i, response in zip(to_estimate, responses):
+            if 'error' in response:
+                results[i]['error'] = Exception("Gas estimation failed: {0}".format(response['error']))
+                del txs[i]
+            else:
+                txs[i]['gas'] = int(response['result'], 16)
+
+        # nonces are only reserved for the transfers which are going to be sent
+        raw = {}
+        for i in sorted(txs.keys()):
+            sender = transfers[i]['sender']
+            self.gas_oracle.apply(txs[i])
+            txs[i]['nonce'] = self.nonce_manager.reserve(address=sender.address)
+            try:
+                raw[i] = self.w3.to_hex(sender.sign_transaction(txs[i]).rawTransaction)
+            except Exception as e:
+                self.nonce_manager.release(address=sender.address, nonce=txs[i]['nonce'])
+                results[i]['error'] = e
+
+        # a request which failed as a whole (a timeout, a 5xx) may or may not have reached the node, so its nonces
+        # are released and the senders resynced: the pending count tells which of them the node has taken
+        failed_senders = set()
+        for chunk in chunked(items=sorted(raw.keys()), size=self.rpc_batch_limit):
+            try:
+                responses = self.transport.rpc_batch(url=self.w3.provider.endpoint_uri,
+                                                     calls=[('eth_sendRawTransaction', [raw[i]]) for i in chunk])
+            except Exception as e:
+                responses = [{'error': e}] * len(chunk)
+            for i, response in zip(chunk, responses):
+                address = transfers[i]['sender'].address
+                if 'error' in response:
+                    self.nonce_manager.release(address=address, nonce=txs[i]['nonce'])
+                    failed_senders.add(address)
+                    results[i]['error'] = Exception("Transaction is not sent: {0}".format(response['error']))
+                else:
+                    self.nonce_manager.confirm(address=address, nonce=txs[i]['nonce'])
+                    results[i]['tx_id'] = response['result']
+
+        for address in failed_senders:
+            self.nonce_manager.resync(address=address)
+
+        return results
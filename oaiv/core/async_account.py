@@ -0,0 +1,400 @@
+# -*- coding: utf-8 -*-
+"""Async account."""
+
+import time
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from oaiv.core.account import InteractionFunctionality, InteractionFunctionalityBitcoin, \
+    InteractionFunctionalityEthereum, EthplorerInteraction, EtherscanInteraction, EtherscanCursor, InfuraInteraction
+from oaiv.tools.lazy import lazy_import
+from oaiv.tools.utils import format_provider, format_async_w3
+from oaiv.tools.tokens import token_registry as default_token_registry
+from oaiv.tools.transport import AsyncHTTPTransport
+from oaiv.tools.nonce import AsyncNonceManager
+from oaiv.tools.gas import AsyncGasOracle
+from oaiv.tools.bulk import async_bulk_map, chunked, AsyncRateLimiter, DEFAULT_MAX_WORKERS
+
+
+eth_utils = lazy_import('eth_utils')
+
+
+class AsyncInteractionFunctionality(InteractionFunctionality):
+    # the asyncio counterpart of InteractionFunctionality: everything which goes to the network is a coroutine
+    # (iter_transactions is an async generator), while address checks and account creation stay plain calls
+    def _make_bitcoin_interaction(self):
+        return AsyncInteractionFunctionalityBitcoin(**self.bitcoin_kwg)
+
+    def _make_ethereum_interaction(self):
+        return AsyncInteractionFunctionalityEthereum(**self.ethereum_kwg)
+
+    async def portfolio(self, holdings, timeout=None):
+        groups = self._portfolio_groups(holdings=holdings)
+
+        async def fetch(blockchain):
+            start = time.perf_counter()
+            try:
+                result, failures = await self._backend(blockchain=blockchain).balance_bulk(
+                    addresses=groups[blockchain])
+            except Exception as e:
+                result, failures = e, {}
+            return result, failures, time.perf_counter() - start
+
+        tasks = {blockchain: asyncio.ensure_future(fetch(blockchain)) for blockchain in groups.keys()}
+        if tasks:
+            _, pending = await asyncio.wait(tasks.values(), timeout=timeout)
+            for task in pending:
+                task.cancel()
+        outcomes = {blockchain: task.result() for blockchain, task in tasks.items()
+                    if task.done() and not task.cancelled()}
+        return self._portfolio_view(groups=groups, outcomes=outcomes, timeout=timeout)
+
+    async def close(self):
+        # only the backends which have been made
+        if self._bitcoin_interaction is not None:
+            await self._bitcoin_interaction.close()
+        if self._ethereum_interaction is not None:
+            await self._ethereum_interaction.close()
+
+
+class AsyncInteractionFunctionalityBitcoin:
+    # bitcoinlib has no async api, so the blocking calls of InteractionFunctionalityBitcoin run in a thread pool
+    # (each of its threads keeps its own Service)
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, cache=None, executor=None, **kwargs):
+        self.max_workers = max_workers
+        self.cache = cache
+        self.executor = executor or ThreadPoolExecutor(max_workers=max_workers)
+        self.blocking = InteractionFunctionalityBitcoin(max_workers=max_workers, cache=cache, executor=self.executor,
+                                                        **kwargs)
+
+    async def _run(self, function, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(function, *args, **kwargs))
+
+    def is_address(self, address):
+        return self.blocking.is_address(address=address)
+
+    def is_formatted_address(self, address):
+        return self.blocking.is_formatted_address(address=address)
+
+    def format_address(self, address):
+        return self.blocking.format_address(address=address)
+
+    def is_supported(self, address):
+        return self.blocking.is_supported(address=address)
+
+    def validate_addresses(self, addresses):
+        return self.blocking.validate_addresses(addresses=addresses)
+
+    def is_key_pair(self, private_key, address):
+        return self.blocking.is_key_pair(private_key=private_key, address=address)
+
+    def verify_key_pairs(self, pairs, processes=None):
+        return self.blocking.verify_key_pairs(pairs=pairs, processes=processes)
+
+    async def balance(self, addresses):
+        result, failures = await self.balance_bulk(addresses=addresses)
+        if failures:
+            raise next(iter(failures.values()))
+        return result
+
+    async def balance_bulk(self, addresses):
+        addresses = list(addresses)
+        if self.cache is not None:
+            return await self.cache.cached_bulk_async(method='balance', addresses=addresses, fetch=self._balance_bulk)
+        else:
+            return await self._balance_bulk(addresses=addresses)
+
+    async def _balance_bulk(self, addresses):
+        balances, failures = await async_bulk_map(
+            function=lambda address: self._run(self.blocking._balance, address),
+            items=addresses, max_workers=self.max_workers)
+        return self.blocking._collect_balances(addresses=addresses, balances=balances, failures=failures)
+
+    async def get_transactions(self, account, sort='desc', raw=True, output='dict'):
+        return await self._run(self.blocking.get_transactions, account=account, sort=sort, raw=raw, output=output)
+
+    async def iter_transaction_pages(self, account, page_size=100, last_txid=''):
+        while True:
+            txs = await self._run(self.blocking.transaction_page, account=account, last_txid=last_txid,
+                                  page_size=page_size)
+            if not txs or txs[-1].txid == last_txid:
+                break
+            yield txs
+            last_txid = txs[-1].txid
+
+    async def iter_transactions(self, account, page_size=100, last_txid=''):
+        async for txs in self.iter_transaction_pages(account=account, page_size=page_size, last_txid=last_txid):
+            for tx in txs:
+                yield tx
+
+    def create_account(self):
+        return self.blocking.create_account()
+
+    def address_deriver(self, **kwargs):
+        return self.blocking.address_deriver(**kwargs)
+
+    def confirmation(self, txid):
+        return asyncio.wrap_future(self.blocking.confirmation(txid=txid))
+
+    async def make_transaction(self, sender, receiver, value=None, gas=None, **kwargs):
+        return await self._run(self.blocking.make_transaction, sender=sender, receiver=receiver, value=value, gas=gas,
+                               **kwargs)
+
+    async def close(self):
+        self.executor.shutdown(wait=False)
+
+
+class AsyncInteractionFunctionalityEthereum(InteractionFunctionalityEthereum):
+    def __init__(self, etherscan_api_key, ethplorer_api_key, ethereum_network, infura_project_id,
+                 max_workers=DEFAULT_MAX_WORKERS, etherscan_rate_limit=5, ethplorer_rate_limit=2, transport=None,
+                 cache=None, token_registry=None, nonce_manager=None, gas_oracle=None):
+        self.network = ethereum_network
+        self.cache = cache
+        self.etherscan_api_key = etherscan_api_key
+        self.ethplorer_api_key = ethplorer_api_key
+        # one aiohttp session for Etherscan and Ethplorer
+        self.transport = transport or AsyncHTTPTransport(pool_maxsize=max_workers)
+        self.provider = format_provider(
+            ethereum_network=ethereum_network,
+            infura_project_id=infura_project_id
+        )
+        self.infura_kwg = {'token_registry': token_registry, 'nonce_manager': nonce_manager,
+                           'gas_oracle': gas_oracle}
+        self._w3 = None
+        self._infura = None
+        self._balance_engine = None
+        self._lock = threading.RLock()
+
+        self.etherscan = AsyncEtherscanInteraction(
+            network=ethereum_network,
+            etherscan_api_key=etherscan_api_key,
+            max_workers=max_workers,
+            rate_limit=etherscan_rate_limit,
+            transport=self.transport
+        )
+        self.ethplorer = AsyncEthplorerInteraction(
+            ethplorer_api_key=ethplorer_api_key,
+            max_workers=max_workers,
+            rate_limit=ethplorer_rate_limit,
+            transport=self.transport
+        )
+
+    def _make_w3(self):
+        return format_async_w3(provider=self.provider, transport=self.transport)
+
+    def _make_infura(self):
+        return AsyncInfuraInteraction(w3=self.w3, transport=self.transport, **self.infura_kwg)
+
+    async def balance(self, addresses):
+        result, failures = await self.balance_bulk(addresses=addresses)
+        if failures:
+            raise next(iter(failures.values()))
+        return result
+
+    async def balance_bulk(self, addresses):
+        addresses = [eth_utils.to_checksum_address(value=address) for address in addresses]
+        if self.cache is not None:
+            return await self.cache.cached_bulk_async(method='balance', addresses=addresses, fetch=self._balance_bulk)
+        else:
+            return await self._balance_bulk(addresses=addresses)
+
+    async def _balance_bulk(self, addresses):
+        etherscan, ethplorer = await asyncio.gather(self.etherscan.balance_bulk(addresses=addresses),
+                                                    self.ethplorer.balance_bulk(addresses=addresses))
+        return self._merge_balances(addresses=addresses, etherscan=etherscan, ethplorer=ethplorer)
+
+    async def balance_matrix(self, addresses, currencies=None, block_identifier=None):
+        addresses = [eth_utils.to_checksum_address(value=address) for address in addresses]
+        return await self.balance_engine.snapshot_async(addresses=addresses, currencies=currencies,
+                                                        block_identifier=block_identifier)
+
+    async def get_transactions(self, account, **kwargs):
+        if self.cache is not None:
+            return await self.cache.cached_async(
+                method='get_transactions', address=eth_utils.to_checksum_address(value=account), params=kwargs,
+                fetch=lambda: self.etherscan.get_transactions(account=account, **kwargs))
+        else:
+            return await self.etherscan.get_transactions(account=account, **kwargs)
+
+    async def make_transaction(self, sender, receiver, **kwargs):
+        tx_id = await self.infura.make_transaction(sender=sender, receiver=receiver, **kwargs)
+        if self.cache is not None:
+            self.cache.invalidate(address=sender.address)
+            self.cache.invalidate(address=receiver.address)
+        return tx_id
+
+    async def make_transactions(self, transfers):
+        transfers = list(transfers)
+        results = await self.infura.make_transactions(transfers=transfers)
+        if self.cache is not None:
+            for transfer, result in zip(transfers, results):
+                if result['tx_id'] is not None:
+                    self.cache.invalidate(address=transfer['sender'].address)
+                    self.cache.invalidate(address=transfer['receiver'].address)
+        return results
+
+    async def close(self):
+        await self.transport.close()
+
+
+class AsyncEthplorerInteraction(EthplorerInteraction):
+    def __init__(self, ethplorer_api_key, max_workers=DEFAULT_MAX_WORKERS, rate_limit=2, transport=None):
+        super().__init__(ethplorer_api_key=ethplorer_api_key, max_workers=max_workers, rate_limit=rate_limit,
+                         transport=transport or AsyncHTTPTransport(pool_maxsize=max_workers))
+        self.rate_limiter = AsyncRateLimiter(calls=rate_limit, period=1.0)
+
+    async def request(self, method, params, kwargs):
+        url, params = self._request_args(method=method, params=params, kwargs=kwargs)
+
+        await self.rate_limiter.acquire()
+        return await self.transport.get_json(url=url, params=params)
+
+    async def _balance(self, address):
+        response_data = await self.request(method='getAddressInfo', params={}, kwargs={'address': address})
+        return self._parse_balance(response_data=response_data)
+
+    async def balance(self, addresses):
+        results, failures = await self.balance_bulk(addresses=addresses)
+        if failures:
+            raise next(iter(failures.values()))
+        return results
+
+    async def balance_bulk(self, addresses, max_workers=None):
+        addresses = list(addresses)
+        responses, failures = await async_bulk_map(function=self._balance, items=addresses,
+                                                   max_workers=max_workers or self.max_workers)
+        return self._collect_balances(addresses=addresses, responses=responses, failures=failures)
+
+
+class AsyncEtherscanInteraction(EtherscanInteraction):
+    def __init__(self, network, etherscan_api_key, max_workers=DEFAULT_MAX_WORKERS, rate_limit=5, transport=None):
+        super().__init__(network=network, etherscan_api_key=etherscan_api_key, max_workers=max_workers,
+                         rate_limit=rate_limit, transport=transport or AsyncHTTPTransport(pool_maxsize=max_workers))
+        self.rate_limiter = AsyncRateLimiter(calls=rate_limit, period=1.0)
+
+    async def request(self, params):
+        url = self.url
+
+        await self.rate_limiter.acquire()
+        return await self.transport.get_json(url=url, params=params)
+
+    async def _balance(self, addresses):
+        response_data = await self.request(params=self._balance_params(addresses=addresses))
+        return self._parse_balance(response_data=response_data)
+
+    async def balance(self, addresses):
+        results, failures = await self.balance_bulk(addresses=addresses)
+        if failures:
+            raise next(iter(failures.values()))
+        return results
+
+    async def balance_bulk(self, addresses, max_workers=None):
+        chunks = chunked(items=addresses, size=self.balancemulti_limit)
+        responses, failures = await async_bulk_map(function=self._balance, items=chunks,
+                                                   max_workers=max_workers or self.max_workers)
+        return self._collect_balances(chunks=chunks, responses=responses, failures=failures)
+
+    async def iter_transactions(self, account, action='txlist', page_size=1000, batch_size=None, cursor=None,
+                                endblock=99999999):
+        cursor = cursor or EtherscanCursor(action=action)
+        position = EtherscanCursor(action=cursor.action, startblock=cursor.startblock, seen=cursor.seen)
+        window = cursor.startblock
+        page = 1
+        batch = []
+        while True:
+            params = self._page_params(account=account, action=cursor.action, window=window, endblock=endblock,
+                                       page=page, page_size=page_size)
+            records = self._page_records(response_data=await self.request(params=params), action=cursor.action)
+
+            for record in self._new_records(records=records, position=position):
+                if batch_size:
+                    batch.append(record)
+                    if len(batch) == batch_size:
+                        cursor.advance(batch)
+                        yield batch
+                        batch = []
+                else:
+                    cursor.advance([record])
+                    yield record
+
+            if len(records) < page_size:
+                break
+            window, page = self._next_page(records=records, window=window, page=page)
+
+        if batch:
+            cursor.advance(batch)
+            yield batch
+
+    async def _request_transactions(self, account, action, sort):
+        return await self.request(self._transactions_params(account=account, action=action, sort=sort))
+
+    async def get_transactions(self, account, sort='desc', raw=True, output='dict', internal=False, merge=False):
+        actions = self._transaction_actions(internal=internal)
+        responses = await asyncio.gather(*[self._request_transactions(account=account, action=action, sort=sort)
+                                           for action in actions])
+        return self._format_transactions(actions=actions, responses=responses, sort=sort, raw=raw, output=output,
+                                         merge=merge)
+
+
+class AsyncInfuraInteraction(InfuraInteraction):
+    def __init__(self, w3, token_registry=None, nonce_manager=None, transport=None, gas_oracle=None):
+        self.w3 = w3
+        self.token_registry = token_registry or default_token_registry
+        self.nonce_manager = nonce_manager or AsyncNonceManager(w3=w3)
+        self.transport = transport or AsyncHTTPTransport()
+        self.gas_oracle = gas_oracle or AsyncGasOracle(w3=w3)
+
+    async def _transaction_body(self, sender, receiver, value=None, currency=None):
+        if value and currency != 'ETH':
+            # token decimals are read (and memoized) here, so that the data field is built without a blocking call
+            await self.token_registry.decimals_async(w3=self.w3, symbol=currency)
+        return super()._transaction_body(sender=sender, receiver=receiver, value=value, currency=currency)
+
+    async def generate_transaction_data(self, sender, receiver, value=None, currency=None, gas=None, nonce=None):
+        tx = await self._transaction_body(sender=sender, receiver=receiver, value=value, currency=currency)
+
+        if gas:
+            tx['gas'] = int(gas)
+        else:
+            tx['gas'] = await self.w3.eth.estimate_gas(tx)
+
+        await self.gas_oracle.apply(tx)
+        tx['nonce'] = (await self.w3.eth.get_transaction_count(sender.address)) if nonce is None else nonce
+
+        return tx
+
+    async def make_transaction(self, sender, receiver, value=None, currency=None, gas=None, **kwargs):
+        nonce = await self.nonce_manager.reserve(address=sender.address)
+        try:
+            tx = await self.generate_transaction_data(sender=sender, receiver=receiver, value=value,
+                                                      currency=currency, gas=gas, nonce=nonce)
+            signed_txn = sender.sign_transaction(tx)
+            tx_id = self.w3.to_hex(await self.w3.eth.send_raw_transaction(signed_txn.rawTransaction))
+        except Exception:
+            self.nonce_manager.release(address=sender.address, nonce=nonce)
+            await self.nonce_manager.resync(address=sender.address)
+            raise
+        self.nonce_manager.confirm(address=sender.address, nonce=nonce)
+        return tx_id
+
+    async def make_transactions(self, transfers):
+        # different senders are served concurrently over the event loop rather than in one JSON-RPC batch,
+        # while the transfers of one sender go one after another, so that its nonces reach the node in order
+        transfers = list(transfers)
+        results = [{'tx_id': None, 'error': None} for _ in transfers]
+        by_sender = {}
+        for i, transfer in enumerate(transfers):
+            by_sender.setdefault(transfer['sender'].address, []).append(i)
+
+        async def send(indices):
+            for i in indices:
+                try:
+                    results[i]['tx_id'] = await self.make_transaction(**transfers[i])
+                except Exception as e:
+                    results[i]['error'] = e
+
+        await async_bulk_map(function=send, items=list(by_sender.values()))
+        return results
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""Sync."""
+
+import json
+import sqlite3
+import datetime
+import threading
+from decimal import Decimal
+
+from oaiv.constants import BlockchainType, blockchain_name
+from oaiv.core.account import EtherscanCursor
+from oaiv.tools.lazy import lazy_import
+from oaiv.tools.normalize import COLUMNS, etherscan_frame, bitcoin_frame
+
+
+pandas = lazy_import('pandas')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    blockchain TEXT NOT NULL,
+    account TEXT NOT NULL,
+    record_key TEXT NOT NULL,
+    tx TEXT NOT NULL,
+    block INTEGER,
+    datetime TEXT,
+    sender TEXT,
+    receiver TEXT,
+    value TEXT,
+    commission_paid TEXT,
+    currency TEXT,
+    PRIMARY KEY (blockchain, account, record_key)
+);
+CREATE INDEX IF NOT EXISTS transactions_account_datetime ON transactions (blockchain, account, datetime);
+CREATE TABLE IF NOT EXISTS sync_state (
+    blockchain TEXT NOT NULL,
+    account TEXT NOT NULL,
+    stream TEXT NOT NULL,
+    state TEXT NOT NULL,
+    PRIMARY KEY (blockchain, account, stream)
+);
+"""
+
+
+def etherscan_rows(records, action):
+    frame = etherscan_frame(records=records, action=action)
+    # the records of iter_transactions carry their key; otherwise the records are taken as one page
+    keys = EtherscanCursor.record_keys(records=records)
+    frame['record_key'] = ['{0}:{1}'.format(action, item.get(EtherscanCursor.key_field) or key)
+                           for item, key in zip(records, keys)]
+    frame['block'] = [int(item['blockNumber']) for item in records]
+    return frame.to_dict(orient='records')
+
+
+def bitcoin_rows(txs, account):
+    frame = bitcoin_frame(txs=txs, account=account)
+    frame['record_key'] = [tx.txid for tx in txs]
+    frame['block'] = [tx.block_height for tx in txs]
+    return frame.to_dict(orient='records')
+
+
+class TransactionStore:
+    # local SQLite store of normalized transactions together with the per-account sync state (high-water marks)
+    def __init__(self, path=':memory:'):
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def insert(self, blockchain, account, rows, stream=None, state=None):
+        # rows and the new sync state are committed together, so the high-water mark never runs ahead of the data
+        records = [(blockchain, account, row['record_key'], row['tx'], row['block'],
+                    None if pandas.isna(row['datetime']) else row['datetime'].isoformat(),
+                    row['sender'], row['receiver'], str(row['value']), str(row['commission_paid']), row['currency'])
+                   for row in rows]
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO transactions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", records)
+            if stream is not None:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?, ?)",
+                    (blockchain, account, stream, json.dumps(state)))
+        return len(records)
+
+    def get_state(self, blockchain, account, stream):
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT state FROM sync_state WHERE blockchain = ? AND account = ? AND stream = ?",
+                (blockchain, account, stream)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def query(self, blockchain, account, sort='desc', currency=None):
+        sql = "SELECT tx, datetime, sender, receiver, value, commission_paid, currency FROM transactions " \
+              "WHERE blockchain = ? AND account = ?"
+        params = [blockchain, account]
+        if currency is not None:
+            sql += " AND currency = ?"
+            params.append(currency)
+        sql += " ORDER BY datetime {0}, tx".format('DESC' if sort == 'desc' else 'ASC')
+        with self._lock:
+            rows = self._connection.execute(sql, params).fetchall()
+
+        results = {column: [] for column in COLUMNS}
+        for tx, tx_datetime, sender, receiver, value, commission, currency in rows:
+            results['tx'].append(tx)
+            results['datetime'].append(None if tx_datetime is None else datetime.datetime.fromisoformat(tx_datetime))
+            results['sender'].append(sender)
+            results['receiver'].append(receiver)
+            results['value'].append(Decimal(value))
+            results['commission_paid'].append(Decimal(commission))
+            results['currency'].append(currency)
+        return results
+
+    def close(self):
+        self._connection.close()
+
+
+class TransactionSync:
+    # incremental history sync on top of InteractionFunctionality: every call fetches only what is newer
+    # than the stored high-water mark (last block for Ethereum, last txid for Bitcoin) and answers from the store
+    def __init__(self, interaction, store, etherscan_actions=('txlist', 'tokentx'), batch_size=1000):
+        self.interaction = interaction
+        self.store = store
+        self.etherscan_actions = etherscan_actions
+        self.batch_size = batch_size
+
+    def sync(self, account, blockchain):
+        account = self.interaction.format_address(address=account, blockchain=blockchain)
+        if blockchain == BlockchainType.ETHEREUM:
+            return self._sync_ethereum(account=account)
+        elif blockchain == BlockchainType.BITCOIN:
+            return self._sync_bitcoin(account=account)
+        else:
+            self.interaction._invalid_blockchain_handler(blockchain)
+
+    def _sync_ethereum(self, account):
+        name = blockchain_name(BlockchainType.ETHEREUM)
+        etherscan = self.interaction.ethereum_interaction.etherscan
+        inserted = 0
+        for action in self.etherscan_actions:
+            state = self.store.get_state(blockchain=name, account=account, stream=action)
+            cursor = EtherscanCursor.from_dict(state) if state else EtherscanCursor(action=action)
+            for batch in etherscan.iter_transactions(account=account, action=action, batch_size=self.batch_size,
+                                                     cursor=cursor):
+                rows = etherscan_rows(records=batch, action=action)
+                inserted += self.store.insert(blockchain=name, account=account, rows=rows,
+                                              stream=action, state=cursor.to_dict())
+        return inserted
+
+    def _sync_bitcoin(self, account):
+        name = blockchain_name(BlockchainType.BITCOIN)
+        bitcoin = self.interaction.bitcoin_interaction
+        state = self.store.get_state(blockchain=name, account=account, stream='gettransactions')
+        last_txid = state['last_txid'] if state else ''
+        inserted = 0
+        for txs in bitcoin.iter_transaction_pages(account=account, page_size=self.batch_size, last_txid=last_txid):
+            # unconfirmed transactions are left for the next sync, so that the high-water mark only covers final data
+            confirmed = []
+            for tx in txs:
+                if not tx.confirmations:
+                    break
+                confirmed.append(tx)
+            if confirmed:
+                last_txid = confirmed[-1].txid
+                rows = bitcoin_rows(txs=confirmed, account=account)
+                inserted += self.store.insert(blockchain=name, account=account, rows=rows,
+                                              stream='gettransactions', state={'last_txid': last_txid})
+            if len(confirmed) < len(txs):
+                break
+        return inserted
+
+    def get_transactions(self, account, blockchain, sort='desc', currency=None, sync=True):
+        if sync:
+            self.sync(account=account, blockchain=blockchain)
+        account = self.interaction.format_address(address=account, blockchain=blockchain)
+        return self.store.query(blockchain=blockchain_name(blockchain), account=account, sort=sort, currency=currency)
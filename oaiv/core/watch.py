@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""Watch."""
+
+from oaiv.constants import BlockchainType
+from oaiv.tools.validation import bitcoin_address_validator, ethereum_address_validator
+
+
+class WatchOnlyActor:
+    # a watch-only actor without the Actor -> ActorEthereum / ActorBitcoin proxy hop: two slots, no w3,
+    # key or encryption fields per instance; it can be passed wherever only actor.address is read (e.g. a receiver)
+    __slots__ = ('blockchain', 'address')
+
+    private_key = None
+    encryption = None
+
+    def __init__(self, blockchain, address):
+        self.blockchain = blockchain
+        self.address = address
+
+    def sign_transaction(self, tx):
+        raise Exception("You have to provide a private_key to use this feature")
+
+
+class WatchOnlyActors:
+    # a large set of watch-only addresses of one blockchain kept as a single list of address strings;
+    # WatchOnlyActor objects are only made on access, and the address -> position index is only built on first lookup
+    __slots__ = ('blockchain', '_addresses', '_index')
+
+    def __init__(self, blockchain, addresses=(), validate=True):
+        if blockchain not in [BlockchainType.ETHEREUM, BlockchainType.BITCOIN]:
+            raise KeyError("Invalid blockchain type {0} is entered; please, check available ones".format(blockchain))
+        self.blockchain = blockchain
+        self._addresses = []
+        self._index = None
+        self.extend(addresses=addresses, validate=validate)
+
+    def _validated(self, addresses):
+        # the same rules as the single actors, checked in one batch:
+        # Ethereum addresses are brought to the checksum format, Bitcoin ones should be p2pkh / p2wpkh
+        if self.blockchain == BlockchainType.ETHEREUM:
+            validated = ethereum_address_validator.format_address(addresses=addresses)
+            message = "Invalid address {0} provided; should be a valid Ethereum address"
+        else:
+            supported = bitcoin_address_validator.is_supported(addresses=addresses)
+            validated = [address if valid else None for address, valid in zip(addresses, supported)]
+            message = "Invalid address {0} provided; should be a valid Bitcoin address"
+        for address, checked in zip(addresses, validated):
+            if checked is None:
+                raise ValueError(message.format(address))
+        return validated
+
+    def extend(self, addresses, validate=True):
+        # validate=False skips the checks for addresses which are known to be valid and formatted
+        addresses = list(addresses)
+        if validate:
+            addresses = self._validated(addresses=addresses)
+        start = len(self._addresses)
+        self._addresses += addresses
+        if self._index is not None:
+            for i, address in enumerate(addresses, start=start):
+                self._index.setdefault(address, i)
+
+    def __len__(self):
+        return len(self._addresses)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [WatchOnlyActor(blockchain=self.blockchain, address=address) for address in self._addresses[i]]
+        return WatchOnlyActor(blockchain=self.blockchain, address=self._addresses[i])
+
+    def __iter__(self):
+        blockchain = self.blockchain
+        for address in self._addresses:
+            yield WatchOnlyActor(blockchain, address)
+
+    def _lookup(self):
+        if self._index is None:
+            index = {}
+            for i, address in enumerate(self._addresses):
+                index.setdefault(address, i)
+            self._index = index
+        return self._index
+
+    def __contains__(self, address):
+        return address in self._lookup()
+
+    def index(self, address):
+        try:
+            return self._lookup()[address]
+        except KeyError:
+            raise ValueError("Address {0} is not in the collection".format(address))
+
+    def get(self, address):
+        i = self._lookup().get(address)
+        return None if i is None else self[i]
+
+    @property
+    def addresses(self):
+        # the underlying list, e.g. for balance_bulk; it should not be modified in place
+        return self._addresses
@@ -1,12 +1,22 @@
 # -*- coding: utf-8 -*-
 """Swaps."""
 
+import threading
 from time import time
+from collections import OrderedDict
+
+from oaiv.tools.multicall import Multicall
+from oaiv.tools.transport import HTTPTransport
+
+
+FEE_TIERS = [100, 500, 3000, 10000]
+DEFAULT_CACHED_BLOCKS = 4
 
 
 class Uniswap:
     # TODO: check for Decimal issue applicability
-    def __init__(self, address, public_key, private_key, provider, web3, router_contract_address, quoter_contract_address, router_contract, quoter_contract):
+    def __init__(self, address, public_key, private_key, provider, web3, router_contract_address, quoter_contract_address, router_contract, quoter_contract,
+                 multicall=None, cached_blocks=DEFAULT_CACHED_BLOCKS, transport=None):
         self.address = address
         self.public_key = public_key
         self.private_key = private_key
@@ -18,13 +28,80 @@ class Uniswap:
         self.router = router_contract
         self.quoter = quoter_contract
 
+        self.multicall = multicall
+        # the Multicall chunks go in one JSON-RPC batch through the transport (the one of the facade can be shared);
+        # one is made for an HTTP provider if none is given
+        self.transport = transport
+        # block number -> {(token_in, token_out, fee, amount_in): amount_out} for the last cached_blocks blocks
+        self.cached_blocks = cached_blocks
+        self._quotes = OrderedDict()
+        self._lock = threading.Lock()
+
     @staticmethod
     def _deadline():
         return int(time()) + 10 * 60
 
+    def _multicall(self):
+        if self.multicall is None:
+            if self.transport is None and getattr(self.web3.provider, 'endpoint_uri', None):
+                self.transport = HTTPTransport()
+            self.multicall = Multicall(w3=self.web3, transport=self.transport)
+        return self.multicall
+
+    def _block_quotes(self, block):
+        with self._lock:
+            if block not in self._quotes:
+                self._quotes[block] = {}
+                while len(self._quotes) > self.cached_blocks:
+                    self._quotes.popitem(last=False)
+            return self._quotes[block]
+
+    def quote_many(self, quotes, block_identifier=None):
+        # quotes are (token_in, token_out, fee, amount_in); the ones not cached for the block are sent to the quoter
+        # in Multicall eth_calls pinned to that block, and the result holds amount_out per quote
+        # (None where the quote reverts, e.g. there is no pool with such a fee)
+        quotes = [(self.web3.to_checksum_address(token_in), self.web3.to_checksum_address(token_out), int(fee),
+                   int(amount_in)) for token_in, token_out, fee, amount_in in quotes]
+        block = self._multicall().block_number(block_identifier=block_identifier)
+        cached = self._block_quotes(block=block)
+
+        missing = list(dict.fromkeys(quote for quote in quotes if quote not in cached))
+        if missing:
+            amounts = self._multicall().call(
+                calls=[(self.quoter, 'quoteExactInputSingle', [token_in, token_out, fee, amount_in, 0])
+                       for token_in, token_out, fee, amount_in in missing],
+                block_identifier=block)
+            with self._lock:
+                cached.update(zip(missing, amounts))
+        return [cached[quote] for quote in quotes]
+
+    def best_quotes(self, pairs, fee_tiers=FEE_TIERS, block_identifier=None):
+        # pairs are (token_in, token_out, amount_in); all fee tiers of all pairs are quoted together,
+        # and the result holds (fee, amount_out) of the best tier per pair, or (None, None) if there is no pool
+        pairs = list(pairs)
+        amounts = self.quote_many(quotes=[(token_in, token_out, fee, amount_in)
+                                          for token_in, token_out, amount_in in pairs for fee in fee_tiers],
+                                  block_identifier=block_identifier)
+        best = []
+        for i in range(len(pairs)):
+            tiers = [(amount, fee) for fee, amount in zip(fee_tiers, amounts[i * len(fee_tiers):(i + 1) * len(fee_tiers)])
+                     if amount is not None]
+            if tiers:
+                amount, fee = max(tiers, key=lambda tier: tier[0])
+                best.append((fee, amount))
+            else:
+                best.append((None, None))
+        return best
+
     def make_trade_input(self, input_token_address, output_token_address, quantity_in_token, fee, slippage):
         sqrtPriceLimitX96 = 0
-        price = self.quoter.functions.quoteExactInputSingle(input_token_address, output_token_address, fee, quantity_in_token, sqrtPriceLimitX96).call()
+        if fee is None:
+            # the best fee tier at the latest block
+            fee, price = self.best_quotes(pairs=[(input_token_address, output_token_address, quantity_in_token)])[0]
+            if fee is None:
+                raise ValueError("No pool found for {0} -> {1}".format(input_token_address, output_token_address))
+        else:
+            price = self.quoter.functions.quoteExactInputSingle(input_token_address, output_token_address, fee, quantity_in_token, sqrtPriceLimitX96).call()
         min_tokens_bought = int((1 - slippage) * price)
         contract_function = self.router.functions.exactInputSingle({
             "tokenIn": input_token_address,
@@ -1,39 +1,33 @@
 # -*- coding: utf-8 -*-
 """Addresses."""
 
-import json
+from oaiv.tools.tokens import token_registry
+from oaiv.tools.contracts import contract_registry
 
-from web3 import Web3
 
-from oaiv.constants import token_info_eth
+tech_address = {
+    'QUOTER': '0xb27308f9F90D607463bb33eA1BeBb41C27CE5AB6',
+    'ROUTER': '0xE592427A0AEce92De3Edee1F18E0157C05861564',
+    # Multicall3 is deployed at the same address on mainnet and most other chains
+    'MULTICALL3': '0xcA11bde05977b3631167028862bE2a173976CA11',
+}
 
 
-def load_contract(name: str, w3: Web3):
+def load_contract(name: str, w3):
     """
 
     :param w3:
     :type name: object
     """
-    address = find_address(name=name)
-    json_file_path = f"tools/abidata/{name}.json"
-
-    try:
-        with open(json_file_path, 'r') as file:
-            abi = json.load(file)
-    except FileNotFoundError:
-        raise Exception("Unknown contract name")
-
-    return w3.eth.contract(address=address, abi=abi)
-
-
-def find_address(name):
-    tech_address = {
-        'QUOTER': '0xb27308f9F90D607463bb33eA1BeBb41C27CE5AB6',
-        'ROUTER': '0xE592427A0AEce92De3Edee1F18E0157C05861564',
-    }
-
-    token_address = {key: token_info_eth[key]['contract'] for key in token_info_eth}
-
-    contract_address = {**tech_address, **token_address}
-
-    return contract_address.get(name, None)
+    # the abi is read once from the package resources and the contract object is kept per w3
+    return contract_registry.contract(w3=w3, address=find_address(name=name), name=name)
+
+
+def find_address(name, registry=None):
+    registry = registry or token_registry
+    if name in tech_address:
+        return tech_address[name]
+    elif name in registry:
+        return registry.contract(symbol=name)
+    else:
+        return None
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""Balances."""
+
+from decimal import Decimal
+
+from oaiv.tools.tokens import token_registry as default_token_registry
+from oaiv.tools.contracts import contract_registry
+from oaiv.tools.multicall import Multicall
+
+
+NATIVE_CURRENCY = 'ETH'
+NATIVE_DECIMALS = 18
+
+
+class BalanceMatrix:
+    # on-chain balances of addresses x currencies read through w3: Multicall3.getEthBalance for ETH and balanceOf
+    # for the tokens of the registry, all sent as Multicall eth_calls pinned to one block number, so that the
+    # matrix is a consistent snapshot; the decimals which are not known yet are read in the same calls
+    def __init__(self, w3, token_registry=None, multicall=None, transport=None):
+        self.w3 = w3
+        self.token_registry = token_registry or default_token_registry
+        self.multicall = multicall or Multicall(w3=w3, transport=transport)
+
+    def _token(self, currency):
+        return contract_registry.contract(w3=self.w3, address=self.token_registry.contract(symbol=currency))
+
+    def _calls(self, addresses, currencies):
+        currencies = self.token_registry.symbols() if currencies is None else list(currencies)
+        missing = [currency for currency in currencies
+                   if currency != NATIVE_CURRENCY and self.token_registry.get(symbol=currency)['decimals'] is None]
+        calls = [(self._token(currency), 'decimals', []) for currency in missing]
+        for address in addresses:
+            for currency in currencies:
+                if currency == NATIVE_CURRENCY:
+                    calls.append((self.multicall.contract, 'getEthBalance', [address]))
+                else:
+                    calls.append((self._token(currency), 'balanceOf', [address]))
+        return currencies, missing, calls
+
+    def _snapshot(self, addresses, currencies, missing, values, block):
+        for currency, decimals in zip(missing, values):
+            if decimals is not None:
+                self.token_registry.register(symbol=currency, contract=self.token_registry.contract(symbol=currency),
+                                             decimals=decimals)
+        values = iter(values[len(missing):])
+
+        view = {'block': block, 'balances': {}, 'failures': {}}
+        for address in addresses:
+            for currency in currencies:
+                value = next(values)
+                decimals = NATIVE_DECIMALS if currency == NATIVE_CURRENCY else \
+                    self.token_registry.get(symbol=currency)['decimals']
+                if value is None or decimals is None:
+                    view['failures'][(address, currency)] = Exception(
+                        "{0} balance of {1} could not be read at block {2}".format(currency, address, block))
+                    continue
+                # TODO: control source libraries for Decimal
+                view['balances'].setdefault(address, {})[currency] = \
+                    Decimal(value) / Decimal('10') ** Decimal(decimals)
+        return view
+
+    def snapshot(self, addresses, currencies=None, block_identifier=None):
+        # addresses should be checksum ones; currencies default to all the symbols of the registry.
+        # The result is {'block': ..., 'balances': {address: {currency: Decimal}},
+        # 'failures': {(address, currency): Exception}}
+        addresses = list(addresses)
+        block = self.multicall.block_number(block_identifier=block_identifier)
+        currencies, missing, calls = self._calls(addresses=addresses, currencies=currencies)
+        values = self.multicall.call(calls=calls, block_identifier=block)
+        return self._snapshot(addresses=addresses, currencies=currencies, missing=missing, values=values, block=block)
+
+    async def snapshot_async(self, addresses, currencies=None, block_identifier=None):
+        # the same for an AsyncWeb3
+        addresses = list(addresses)
+        block = await self.multicall.block_number_async(block_identifier=block_identifier)
+        currencies, missing, calls = self._calls(addresses=addresses, currencies=currencies)
+        values = await self.multicall.call_async(calls=calls, block_identifier=block)
+        return self._snapshot(addresses=addresses, currencies=currencies, missing=missing, values=values, block=block)
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""Bulk."""
+
+import time
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+DEFAULT_MAX_WORKERS = 8
+
+
+def bulk_map(function, items, max_workers=DEFAULT_MAX_WORKERS, executor=None):
+    # results are aligned with items; an item which raised is left as None and its exception is put to failures.
+    # A single item is run in the calling thread; with an executor, its threads are reused (and at most max_workers
+    # items are submitted at once), otherwise a pool is made for the call
+    items = list(items)
+    results = [None] * len(items)
+    failures = {}
+    if not items:
+        return results, failures
+
+    if len(items) == 1:
+        try:
+            results[0] = function(items[0])
+        except Exception as e:
+            failures[0] = e
+        return results, failures
+
+    max_workers = max(1, min(max_workers or DEFAULT_MAX_WORKERS, len(items)))
+    if executor is not None:
+        futures = _submit_bounded(executor=executor, function=function, items=items, max_workers=max_workers)
+        _collect(futures=futures, results=results, failures=failures)
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            _collect(futures=[executor.submit(function, item) for item in items], results=results, failures=failures)
+    return results, failures
+
+
+def _submit_bounded(executor, function, items, max_workers):
+    # the executor may be shared, so the number of items in it is bounded here rather than by its size
+    semaphore = threading.BoundedSemaphore(max_workers)
+    futures = []
+    for item in items:
+        semaphore.acquire()
+        future = executor.submit(function, item)
+        future.add_done_callback(lambda _: semaphore.release())
+        futures.append(future)
+    return futures
+
+
+def _collect(futures, results, failures):
+    for i, future in enumerate(futures):
+        try:
+            results[i] = future.result()
+        except Exception as e:
+            failures[i] = e
+
+
+async def async_bulk_map(function, items, max_workers=DEFAULT_MAX_WORKERS):
+    # the asyncio counterpart of bulk_map: function is a coroutine function, at most max_workers calls run at once
+    items = list(items)
+    failures = {}
+    semaphore = asyncio.Semaphore(max(1, max_workers or DEFAULT_MAX_WORKERS))
+
+    async def call(item):
+        async with semaphore:
+            return await function(item)
+
+    results = await asyncio.gather(*[call(item) for item in items], return_exceptions=True)
+    for i, result in enumerate(results):
+        if isinstance(result, Exception):
+            failures[i] = result
+            results[i] = None
+    return results, failures
+
+
+def chunked(items, size):
+    items = list(items)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+class RateLimiter:
+    # sliding window limiter shared by all threads calling the same provider: at most `calls` per `period` seconds
+    def __init__(self, calls, period=1.0):
+        self.calls = calls
+        self.period = period
+        self._lock = threading.Lock()
+        self._timestamps = deque()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._timestamps and now - self._timestamps[0] >= self.period:
+                    self._timestamps.popleft()
+                if len(self._timestamps) < self.calls:
+                    self._timestamps.append(now)
+                    return
+                delay = self.period - (now - self._timestamps[0])
+            time.sleep(delay)
+
+
+class AsyncRateLimiter:
+    # the same sliding window for coroutines running in one event loop; waiting callers sleep without blocking the loop
+    def __init__(self, calls, period=1.0):
+        self.calls = calls
+        self.period = period
+        self._timestamps = deque()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            while self._timestamps and now - self._timestamps[0] >= self.period:
+                self._timestamps.popleft()
+            if len(self._timestamps) < self.calls:
+                self._timestamps.append(now)
+                return
+            await asyncio.sleep(self.period - (now - self._timestamps[0]))
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""Cache."""
+
+import time
+import threading
+from collections import OrderedDict
+
+
+DEFAULT_TTL = {
+    'balance': 15,
+    'get_transactions': 60,
+}
+
+
+class ResponseCache:
+    # size-bounded LRU cache for read-only provider calls;
+    # entries are keyed by (method, address, params) and expire after the TTL configured for their method
+    def __init__(self, maxsize=4096, ttl=None, default_ttl=30):
+        self.maxsize = maxsize
+        self.ttl = {**DEFAULT_TTL, **(ttl or {})}
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(method, address, params):
+        return method, address, tuple(sorted((params or {}).items()))
+
+    def lookup(self, method, address, params=None):
+        key = self._key(method=method, address=address, params=params)
+        with self._lock:
+            if key in self._data:
+                expires, value = self._data[key]
+                if expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._data[key]
+            self.misses += 1
+            return False, None
+
+    def store(self, method, address, value, params=None):
+        key = self._key(method=method, address=address, params=params)
+        expires = time.monotonic() + self.ttl.get(method, self.default_ttl)
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def cached(self, method, address, fetch, params=None):
+        hit, value = self.lookup(method=method, address=address, params=params)
+        if not hit:
+            value = fetch()
+            self.store(method=method, address=address, value=value, params=params)
+        return value
+
+    async def cached_async(self, method, address, fetch, params=None):
+        # fetch is a coroutine function here
+        hit, value = self.lookup(method=method, address=address, params=params)
+        if not hit:
+            value = await fetch()
+            self.store(method=method, address=address, value=value, params=params)
+        return value
+
+    def _split(self, method, addresses, params):
+        result = {}
+        missing = []
+        for address in addresses:
+            hit, value = self.lookup(method=method, address=address, params=params)
+            if hit:
+                result[address] = value
+            else:
+                missing.append(address)
+        return result, missing
+
+    def _merge(self, method, addresses, result, fetched, params):
+        for address in fetched.keys():
+            self.store(method=method, address=address, value=fetched[address], params=params)
+        result.update(fetched)
+        return {address: result[address] for address in addresses if address in result}
+
+    def cached_bulk(self, method, addresses, fetch, params=None):
+        # fetch is called once with the addresses missing from the cache and should return (result, failures)
+        result, missing = self._split(method=method, addresses=addresses, params=params)
+        fetched, failures = fetch(missing) if missing else ({}, {})
+        return self._merge(method=method, addresses=addresses, result=result, fetched=fetched, params=params), failures
+
+    async def cached_bulk_async(self, method, addresses, fetch, params=None):
+        result, missing = self._split(method=method, addresses=addresses, params=params)
+        fetched, failures = (await fetch(missing)) if missing else ({}, {})
+        return self._merge(method=method, addresses=addresses, result=result, fetched=fetched, params=params), failures
+
+    def invalidate(self, address):
+        with self._lock:
+            for key in [key for key in self._data.keys() if key[1] == address]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._data)}
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""Contracts."""
+
+import json
+import weakref
+import threading
+from importlib import resources
+
+from oaiv.constants import EIP20_ABI
+from oaiv.tools.lazy import lazy_import
+
+
+eth_utils = lazy_import('eth_utils')
+
+ABI_PACKAGE = 'oaiv.tools'
+ABI_DIRECTORY = 'abidata'
+# attribute of a w3 instance which holds its cached contracts
+CONTRACTS_ATTRIBUTE = '_oaiv_contracts'
+
+
+class ContractRegistry:
+    # each ABI is read once (oaiv/tools/abidata/<name>.json through the package resources, or registered in memory),
+    # contract objects are kept per w3 and per (address, abi name), and function selectors per (abi name, function name):
+    # building a contract object takes milliseconds. The contracts refer to their w3, so a registry-held mapping
+    # would keep every w3 alive; they are kept on the w3 itself instead (in a WeakKeyDictionary by registry),
+    # and go away together with it, while the registry only keeps weak references to the w3 instances for clear()
+    def __init__(self):
+        self._abis = {'EIP20': EIP20_ABI}
+        self._w3s = weakref.WeakSet()
+        self._selectors = {}
+        self._lock = threading.Lock()
+
+    def register_abi(self, name, abi):
+        with self._lock:
+            self._abis[name] = abi
+
+    def abi(self, name):
+        if name not in self._abis:
+            try:
+                abi = json.loads((resources.files(ABI_PACKAGE) / ABI_DIRECTORY / '{0}.json'.format(name)).read_text())
+            except FileNotFoundError:
+                raise Exception("Unknown contract name")
+            with self._lock:
+                self._abis.setdefault(name, abi)
+        return self._abis[name]
+
+    def contract(self, w3, address, name='EIP20'):
+        key = (address, name)
+        with self._lock:
+            registries = w3.__dict__.setdefault(CONTRACTS_ATTRIBUTE, weakref.WeakKeyDictionary())
+            contracts = registries.setdefault(self, {})
+            self._w3s.add(w3)
+            contract = contracts.get(key)
+        if contract is None:
+            checksum_address = None if address is None else eth_utils.to_checksum_address(address)
+            contract = w3.eth.contract(checksum_address, abi=self.abi(name=name))
+            with self._lock:
+                contract = contracts.setdefault(key, contract)
+        return contract
+
+    def selector(self, name, fn_name):
+        # '0x' + the first 4 bytes of keccak of the function signature, as in the call data
+        key = (name, fn_name)
+        if key not in self._selectors:
+            abi = [item for item in self.abi(name=name) if item.get('type') == 'function' and item['name'] == fn_name]
+            if len(abi) != 1:
+                raise KeyError("Function {0} is not found in the {1} abi or is ambiguous".format(fn_name, name))
+            selector = '0x' + eth_utils.function_abi_to_4byte_selector(abi[0]).hex()
+            with self._lock:
+                self._selectors[key] = selector
+        return self._selectors[key]
+
+    def clear(self):
+        with self._lock:
+            for w3 in list(self._w3s):
+                w3.__dict__.get(CONTRACTS_ATTRIBUTE, {}).pop(self, None)
+            self._w3s.clear()
+            self._selectors.clear()
+
+
+contract_registry = ContractRegistry()
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""Derivation."""
+
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from oaiv.constants import BlockchainType
+from oaiv.tools.lazy import lazy_import
+
+
+bitcoinlib_keys = lazy_import('bitcoinlib.keys')
+bitcoinlib_mnemonic = lazy_import('bitcoinlib.mnemonic')
+eth_utils = lazy_import('eth_utils')
+
+
+# purpose -> (script_type, encoding, witness_type); as elsewhere, only compressed p2pkh and p2wpkh are supported
+BITCOIN_PURPOSES = {
+    44: ('p2pkh', 'base58', 'legacy'),
+    84: ('p2wpkh', 'bech32', 'segwit'),
+}
+COIN_TYPES = {
+    BlockchainType.BITCOIN: 0,
+    BlockchainType.ETHEREUM: 60,
+}
+# SLIP-44 coin type of all the test networks (testnet, signet, regtest) under BIP44 / BIP84
+TESTNET_COIN_TYPE = 1
+DEFAULT_PURPOSES = {
+    BlockchainType.BITCOIN: 84,
+    BlockchainType.ETHEREUM: 44,
+}
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def coin_type(blockchain, network='bitcoin'):
+    if blockchain == BlockchainType.BITCOIN and network != 'bitcoin':
+        return TESTNET_COIN_TYPE
+    return COIN_TYPES[blockchain]
+
+
+def account_path(blockchain, purpose=None, account=0, network='bitcoin'):
+    return "m/{0}'/{1}'/{2}'".format(purpose or DEFAULT_PURPOSES[blockchain],
+                                     coin_type(blockchain=blockchain, network=network), account)
+
+
+def _address(key, blockchain, purpose):
+    if blockchain == BlockchainType.ETHEREUM:
+        return eth_utils.to_checksum_address(eth_utils.keccak(key.public_uncompressed_byte[1:])[-20:])
+    else:
+        script_type, encoding, _ = BITCOIN_PURPOSES[purpose]
+        return key.address(script_type=script_type, encoding=encoding)
+
+
+def _derive_range(xpub, blockchain, purpose, change, start, stop):
+    # module level, so that process pool workers can run it; only the extended public key is sent to them
+    branch = bitcoinlib_keys.HDKey(xpub).child_public(change)
+    return [(index, _address(key=branch.child_public(index), blockchain=blockchain, purpose=purpose))
+            for index in range(start, stop)]
+
+
+class AddressDeriver:
+    # watch-only derivation of addresses m/purpose'/coin'/account'/change/index (BIP32 / BIP44 / BIP84);
+    # a seed or a mnemonic is only used once, to get the account-level extended public key (xpub / zpub),
+    # so no private key is held while addresses are generated
+    def __init__(self, blockchain, seed=None, mnemonic=None, xpub=None, purpose=None, account=0, passphrase='',
+                 network='bitcoin'):
+        if blockchain not in COIN_TYPES.keys():
+            raise KeyError("Invalid blockchain type {0} is entered; please, check available ones".format(blockchain))
+        if sum(value is not None for value in (seed, mnemonic, xpub)) != 1:
+            raise ValueError("Exactly one of seed, mnemonic or xpub should be provided")
+        self.blockchain = blockchain
+
+        if xpub is not None:
+            key = bitcoinlib_keys.HDKey(xpub, network=network)
+            if key.is_private:
+                raise ValueError("An extended public key is expected; use seed or mnemonic for private keys")
+            if purpose is None and blockchain == BlockchainType.BITCOIN:
+                purpose = 84 if key.witness_type == 'segwit' else 44
+        else:
+            if mnemonic is not None:
+                seed = bitcoinlib_mnemonic.Mnemonic().to_seed(mnemonic, password=passphrase)
+            elif isinstance(seed, str):
+                seed = bytes.fromhex(seed)
+            key = bitcoinlib_keys.HDKey.from_seed(seed, network=network).subkey_for_path(
+                account_path(blockchain=blockchain, purpose=purpose, account=account, network=network))
+
+        self.purpose = purpose or DEFAULT_PURPOSES[blockchain]
+        if blockchain == BlockchainType.BITCOIN and self.purpose not in BITCOIN_PURPOSES.keys():
+            raise ValueError("Invalid purpose value {0} provided; should be one of {1}".format(
+                self.purpose, list(BITCOIN_PURPOSES.keys())))
+        witness_type = BITCOIN_PURPOSES[self.purpose][2] if blockchain == BlockchainType.BITCOIN else 'legacy'
+        self.xpub = key.wif_public(witness_type=witness_type)
+
+    def address(self, index, change=0):
+        return _derive_range(xpub=self.xpub, blockchain=self.blockchain, purpose=self.purpose, change=change,
+                             start=index, stop=index + 1)[0][1]
+
+    def derive(self, start, stop, change=0):
+        return _derive_range(xpub=self.xpub, blockchain=self.blockchain, purpose=self.purpose, change=change,
+                             start=start, stop=stop)
+
+    def iter_addresses(self, start, stop, change=0, chunk_size=DEFAULT_CHUNK_SIZE, processes=None):
+        # yields (index, address) in index order; a range of more than one chunk is spread over a process pool
+        # (processes=1 keeps everything in the calling process), with a bounded number of chunks in flight
+        chunks = [(i, min(i + chunk_size, stop)) for i in range(start, stop, chunk_size)]
+        if len(chunks) <= 1 or processes == 1:
+            for chunk_start, chunk_stop in chunks:
+                yield from self.derive(start=chunk_start, stop=chunk_stop, change=change)
+            return
+
+        processes = processes or os.cpu_count() or 1
+        chunks = iter(chunks)
+        in_flight = deque()
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+
+            def submit():
+                chunk = next(chunks, None)
+                if chunk is not None:
+                    in_flight.append(executor.submit(_derive_range, self.xpub, self.blockchain, self.purpose, change,
+                                                     chunk[0], chunk[1]))
+
+            for _ in range(2 * processes):
+                submit()
+            while in_flight:
+                records = in_flight.popleft().result()
+                submit()
+                yield from records
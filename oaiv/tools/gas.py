@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""Gas."""
+
+import time
+import asyncio
+import threading
+from statistics import median
+
+
+class GasOracle:
+    # fee values shared by every sender: they are read from the chain at most once per `interval` seconds
+    # (or once per new block with watch()), and served from memory in between;
+    # on post-London chains transactions get maxFeePerGas / maxPriorityFeePerGas, otherwise a legacy gasPrice
+    def __init__(self, w3, interval=12, history_blocks=5, priority_percentile=50, base_fee_multiplier=2,
+                 eip1559=True):
+        self.w3 = w3
+        self.interval = interval
+        self.history_blocks = history_blocks
+        self.priority_percentile = priority_percentile
+        self.base_fee_multiplier = base_fee_multiplier
+        self.eip1559 = eip1559
+        self._fees = None
+        self._updated = 0
+        self._chain_id = None
+        self._lock = threading.Lock()
+        self._watcher = None
+        self._stop = threading.Event()
+
+    def _read_fees(self):
+        rewards = []
+        try:
+            history = self.w3.eth.fee_history(self.history_blocks, 'latest', [self.priority_percentile])
+            # the last item is the base fee of the next (pending) block
+            base_fee = int(history['baseFeePerGas'][-1])
+            rewards = [int(reward[0]) for reward in history.get('reward', []) if reward]
+        except Exception:
+            # a node without eth_feeHistory: fall back to the latest block header
+            try:
+                base_fee = int(self.w3.eth.get_block('latest').get('baseFeePerGas', 0))
+            except Exception:
+                base_fee = 0
+
+        if not base_fee:
+            # pre-London chain
+            return self._fee_values(base_fee=None, priority_fee=None, gas_price=self.w3.eth.gas_price)
+
+        if rewards:
+            priority_fee = int(median(rewards))
+        else:
+            try:
+                priority_fee = self.w3.eth.max_priority_fee
+            except Exception:
+                priority_fee = max(self.w3.eth.gas_price - base_fee, 0)
+        return self._fee_values(base_fee=base_fee, priority_fee=priority_fee)
+
+    def _fee_values(self, base_fee, priority_fee, gas_price=None):
+        if base_fee is None:
+            return {'gasPrice': gas_price, 'baseFeePerGas': None, 'maxPriorityFeePerGas': None, 'maxFeePerGas': None}
+        return {
+            'gasPrice': base_fee + priority_fee,
+            'baseFeePerGas': base_fee,
+            'maxPriorityFeePerGas': priority_fee,
+            'maxFeePerGas': base_fee * self.base_fee_multiplier + priority_fee,
+        }
+
+    def refresh(self):
+        fees = self._read_fees()
+        with self._lock:
+            self._fees = fees
+            self._updated = time.monotonic()
+        return fees
+
+    def fees(self):
+        with self._lock:
+            if self._fees is not None and time.monotonic() - self._updated < self.interval:
+                return self._fees
+        return self.refresh()
+
+    @property
+    def chain_id(self):
+        if self._chain_id is None:
+            self._chain_id = self.w3.eth.chain_id
+        return self._chain_id
+
+    def _dynamic(self, fees):
+        return self.eip1559 and fees['maxFeePerGas'] is not None
+
+    def apply(self, tx):
+        fees = self.fees()
+        return self._apply_fees(tx=tx, fees=fees, chain_id=self.chain_id if self._dynamic(fees) else None)
+
+    def _apply_fees(self, tx, fees, chain_id):
+        if self._dynamic(fees):
+            tx.pop('gasPrice', None)
+            tx['maxFeePerGas'] = fees['maxFeePerGas']
+            tx['maxPriorityFeePerGas'] = fees['maxPriorityFeePerGas']
+            tx['chainId'] = chain_id
+        else:
+            tx['gasPrice'] = fees['gasPrice']
+        return tx
+
+    def watch(self, poll_interval=2):
+        # refreshes the fees in the background as soon as a new block shows up
+        if self._watcher is not None:
+            return
+
+        def run():
+            last_block = None
+            while not self._stop.wait(poll_interval):
+                try:
+                    block = self.w3.eth.block_number
+                    if block != last_block:
+                        last_block = block
+                        self.refresh()
+                except Exception:
+                    continue
+
+        self._stop.clear()
+        self._watcher = threading.Thread(target=run, daemon=True)
+        self._watcher.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+
+class AsyncGasOracle(GasOracle):
+    # the same shared fees for an AsyncWeb3; watch() runs as a task of the current event loop instead of a thread
+    async def _read_fees(self):
+        rewards = []
+        try:
+            history = await self.w3.eth.fee_history(self.history_blocks, 'latest', [self.priority_percentile])
+            base_fee = int(history['baseFeePerGas'][-1])
+            rewards = [int(reward[0]) for reward in history.get('reward', []) if reward]
+        except Exception:
+            try:
+                base_fee = int((await self.w3.eth.get_block('latest')).get('baseFeePerGas', 0))
+            except Exception:
+                base_fee = 0
+
+        if not base_fee:
+            return self._fee_values(base_fee=None, priority_fee=None, gas_price=await self.w3.eth.gas_price)
+
+        if rewards:
+            priority_fee = int(median(rewards))
+        else:
+            try:
+                priority_fee = await self.w3.eth.max_priority_fee
+            except Exception:
+                priority_fee = max(await self.w3.eth.gas_price - base_fee, 0)
+        return self._fee_values(base_fee=base_fee, priority_fee=priority_fee)
+
+    async def refresh(self):
+        fees = await self._read_fees()
+        with self._lock:
+            self._fees = fees
+            self._updated = time.monotonic()
+        return fees
+
+    async def fees(self):
+        with self._lock:
+            if self._fees is not None and time.monotonic() - self._updated < self.interval:
+                return self._fees
+        return await self.refresh()
+
+    @property
+    async def chain_id(self):
+        if self._chain_id is None:
+            self._chain_id = await self.w3.eth.chain_id
+        return self._chain_id
+
+    async def apply(self, tx):
+        fees = await self.fees()
+        return self._apply_fees(tx=tx, fees=fees, chain_id=(await self.chain_id) if self._dynamic(fees) else None)
+
+    def watch(self, poll_interval=2):
+        if self._watcher is not None:
+            return
+
+        async def run():
+            last_block = None
+            while True:
+                await asyncio.sleep(poll_interval)
+                try:
+                    block = await self.w3.eth.block_number
+                    if block != last_block:
+                        last_block = block
+                        await self.refresh()
+                except Exception:
+                    continue
+
+        self._watcher = asyncio.get_running_loop().create_task(run())
+
+    def stop(self):
+        if self._watcher is not None:
+            self._watcher.cancel()
+            self._watcher = None
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""Key pair."""
+
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+from oaiv.constants import BlockchainType
+from oaiv.tools.lazy import lazy_import
+
+
+eth_account = lazy_import('eth_account')
+bitcoinlib_encoding = lazy_import('bitcoinlib.encoding')
+bitcoinlib_keys = lazy_import('bitcoinlib.keys')
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_THRESHOLD = 1_000
+DEFAULT_CHUNK_SIZE = 250
+# order of the secp256k1 group: a private key is a scalar in [1, n)
+SECP256K1_N = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141
+
+
+def bitcoin_key_pair(private_key, address):
+    # one public key derivation compared to the hash inside the address, instead of building and encoding an address
+    if not private_key:
+        return False
+    try:
+        address_parsed = bitcoinlib_keys.Address.parse(address)
+        if (address_parsed.encoding, address_parsed.script_type) in [('base58', 'p2pkh'), ('bech32', 'p2wpkh')]:
+            key = bitcoinlib_keys.HDKey(private_key, compressed=True)
+            # the address prefix of the key network, so that e.g. a mainnet key does not match a testnet address
+            prefix = key.network.prefix_bech32 if address_parsed.encoding == 'bech32' else key.network.prefix_address
+            return address_parsed.prefix == prefix and \
+                address_parsed.hash_bytes == bitcoinlib_encoding.hash160(key.public_byte)
+        # only p2pkh / p2wpkh addressed derived from compressed public_key are supported
+        # all other formats (including non-compressed p2pkh / p2sh / p2sh-p2wpkh / p2tr)
+        # might have unexpected behavior here
+        hdkey = bitcoinlib_keys.HDKey(private_key, compressed=True, encoding=address_parsed.encoding,
+                                      witness_type=address_parsed.witness_type)
+        address_derived = hdkey.address(script_type=address_parsed.script_type, encoding=address_parsed.encoding)
+        return address_parsed.address == address_derived
+    except (bitcoinlib_keys.BKeyError, bitcoinlib_encoding.EncodingError) as e:
+        logger.debug("Bitcoin key pair check failed: %s", e)
+        return False
+
+
+def _ethereum_key_in_range(private_key):
+    # eth_keys raises a bare Exception for a scalar out of the curve order (and accepts a zero one)
+    if isinstance(private_key, str):
+        private_key = bytes.fromhex(private_key[2:] if private_key[:2].lower() == '0x' else private_key)
+    if isinstance(private_key, bytes):
+        private_key = int.from_bytes(private_key, 'big')
+    return not isinstance(private_key, int) or 0 < private_key < SECP256K1_N
+
+
+def ethereum_key_pair(private_key, address):
+    # the address is derived from the key directly: one EC multiplication instead of a signature and a recovery
+    try:
+        if not _ethereum_key_in_range(private_key):
+            return False
+        return eth_account.Account.from_key(private_key).address == address
+    except (ValueError, TypeError) as e:
+        logger.debug("Ethereum key pair check failed: %s", e)
+        return False
+
+
+KEY_PAIR = {
+    BlockchainType.BITCOIN: bitcoin_key_pair,
+    BlockchainType.ETHEREUM: ethereum_key_pair,
+}
+
+
+def _chunk_key_pairs(blockchain, pairs):
+    return [KEY_PAIR[blockchain](private_key=private_key, address=address) for private_key, address in pairs]
+
+
+def verify_key_pairs(blockchain, pairs, processes=None, pool_threshold=DEFAULT_POOL_THRESHOLD,
+                     chunk_size=DEFAULT_CHUNK_SIZE):
+    # pairs are (private_key, address); the result is a list of booleans aligned with them,
+    # computed in a process pool when there are at least pool_threshold pairs
+    if blockchain not in KEY_PAIR.keys():
+        raise KeyError("Invalid blockchain type {0} is entered; please, check available ones".format(blockchain))
+    pairs = list(pairs)
+    if len(pairs) < pool_threshold or processes == 1:
+        return _chunk_key_pairs(blockchain=blockchain, pairs=pairs)
+
+    chunks = [pairs[i:i + chunk_size] for i in range(0, len(pairs), chunk_size)]
+    results = []
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        for verified in executor.map(_chunk_key_pairs, [blockchain] * len(chunks), chunks):
+            results += verified
+    return results
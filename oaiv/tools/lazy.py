@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""Lazy."""
+
+import importlib
+import threading
+
+
+class LazyModule:
+    # stands for a module which is imported on first attribute access only (e.g. bitcoinlib or pandas, which take
+    # hundreds of milliseconds to import); every attribute read is then kept on the placeholder itself,
+    # so later reads cost as much as a plain attribute access, as with "from module import name"
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._module is None:
+                self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, item):
+        # only called for the attributes which are not kept yet
+        if item.startswith('__') and item.endswith('__'):
+            raise AttributeError(item)
+        value = getattr(self._module or self._load(), item)
+        setattr(self, item, value)
+        return value
+
+    def __repr__(self):
+        return "<lazy module '{0}' ({1})>".format(self._name, 'loaded' if self._module is not None else 'not loaded')
+
+
+def lazy_import(name):
+    return LazyModule(name=name)
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""Multicall."""
+
+import asyncio
+
+from oaiv.tools.bulk import chunked
+from oaiv.tools.lazy import lazy_import
+from oaiv.tools.contracts import contract_registry
+from oaiv.tools.address import find_address
+
+
+eth_utils = lazy_import('eth_utils')
+eth_abi_exceptions = lazy_import('eth_abi.exceptions')
+
+# calls per aggregate3; keeps a chunk of quoter calls well below the eth_call gas cap of the providers
+DEFAULT_CHUNK_SIZE = 100
+
+
+def _abi_type(item):
+    # canonical type of an abi input / output, with the tuple components spelled out
+    if item['type'].startswith('tuple'):
+        return '({0}){1}'.format(','.join(_abi_type(component) for component in item['components']),
+                                 item['type'][len('tuple'):])
+    return item['type']
+
+
+def _block_parameter(block_identifier):
+    return hex(block_identifier) if isinstance(block_identifier, int) else block_identifier
+
+
+class Multicall:
+    # many contract reads in a few eth_calls: the calls are grouped into Multicall3 aggregate3 calls of chunk_size,
+    # which, with a transport, all go in one JSON-RPC batch; each call is allowed to fail on its own.
+    # The call data is encoded with the codec directly, from the selector and the types kept per function,
+    # as Contract.encodeABI costs milliseconds per call
+    def __init__(self, w3, address=None, chunk_size=DEFAULT_CHUNK_SIZE, transport=None):
+        self.w3 = w3
+        self.address = address or find_address(name='MULTICALL3')
+        self.chunk_size = chunk_size
+        self.transport = transport
+        self.contract = contract_registry.contract(w3=w3, address=self.address, name='MULTICALL3')
+        self._functions = {}
+        self._aggregate3 = self._function(contract=self.contract, fn_name='aggregate3')[0]
+
+    def _function(self, contract, fn_name):
+        # (selector, input types, output types) of a contract function
+        key = (contract.address, fn_name)
+        if key not in self._functions:
+            abi = contract.get_function_by_name(fn_name).abi
+            self._functions[key] = (eth_utils.function_abi_to_4byte_selector(abi),
+                                    [_abi_type(item) for item in abi['inputs']],
+                                    [_abi_type(item) for item in abi['outputs']])
+        return self._functions[key]
+
+    def encode(self, contract, fn_name, args):
+        selector, input_types, _ = self._function(contract=contract, fn_name=fn_name)
+        return selector + self.w3.codec.encode(input_types, args)
+
+    def _prepare(self, calls):
+        # aggregate3 call data per chunk, and the output types per call
+        outputs = []
+        payloads = []
+        for chunk in chunked(items=calls, size=self.chunk_size):
+            call3 = []
+            for contract, fn_name, args in chunk:
+                call3.append((contract.address, True, self.encode(contract=contract, fn_name=fn_name, args=args)))
+                outputs.append(self._function(contract=contract, fn_name=fn_name)[2])
+            payloads.append('0x' + (self._aggregate3 + self.w3.codec.encode(['(address,bool,bytes)[]'], [call3])).hex())
+        return payloads, outputs
+
+    def _rpc_calls(self, payloads, block_identifier):
+        return [('eth_call', [{'to': self.address, 'data': data}, _block_parameter(block_identifier)])
+                for data in payloads]
+
+    @staticmethod
+    def _rpc_results(responses):
+        results = []
+        for response in responses:
+            if 'error' in response:
+                raise Exception("Multicall failed: {0}".format(response['error']))
+            results.append(bytes.fromhex(response['result'][2:]))
+        return results
+
+    def _decode(self, results, outputs):
+        aggregated = []
+        for data in results:
+            aggregated += self.w3.codec.decode(['(bool,bytes)[]'], data)[0]
+
+        values = []
+        for (success, return_data), types in zip(aggregated, outputs):
+            if not success or (types and not return_data):
+                values.append(None)
+                continue
+            try:
+                decoded = self.w3.codec.decode(types, return_data)
+            except eth_abi_exceptions.DecodingError:
+                # e.g. a call to an address without such a function
+                values.append(None)
+                continue
+            values.append(decoded[0] if len(decoded) == 1 else decoded)
+        return values
+
+    def block_number(self, block_identifier=None):
+        # a block number to pin several eth_calls to the same block ('latest' may move between them)
+        if block_identifier is None or block_identifier == 'latest':
+            return self.w3.eth.block_number
+        if isinstance(block_identifier, int):
+            return block_identifier
+        return self.w3.eth.get_block(block_identifier)['number']
+
+    def call(self, calls, block_identifier='latest'):
+        # calls are (contract, function name, args); the result is a list aligned with them holding the decoded
+        # output (unpacked if there is a single one) or None for a reverted call
+        payloads, outputs = self._prepare(calls=calls)
+        if self.transport is not None:
+            results = self._rpc_results(responses=self.transport.rpc_batch(
+                url=self.w3.provider.endpoint_uri, calls=self._rpc_calls(payloads=payloads,
+                                                                         block_identifier=block_identifier)))
+        else:
+            results = [bytes(self.w3.eth.call({'to': self.address, 'data': data}, block_identifier=block_identifier))
+                       for data in payloads]
+        return self._decode(results=results, outputs=outputs)
+
+    async def block_number_async(self, block_identifier=None):
+        # the same for an AsyncWeb3
+        if block_identifier is None or block_identifier == 'latest':
+            return await self.w3.eth.block_number
+        if isinstance(block_identifier, int):
+            return block_identifier
+        return (await self.w3.eth.get_block(block_identifier))['number']
+
+    async def call_async(self, calls, block_identifier='latest'):
+        # the same for an AsyncWeb3 and an AsyncHTTPTransport; the chunks are sent concurrently without a transport
+        payloads, outputs = self._prepare(calls=calls)
+        if self.transport is not None:
+            results = self._rpc_results(responses=await self.transport.rpc_batch(
+                url=self.w3.provider.endpoint_uri, calls=self._rpc_calls(payloads=payloads,
+                                                                         block_identifier=block_identifier)))
+        else:
+            results = [bytes(data) for data in await asyncio.gather(*[
+                self.w3.eth.call({'to': self.address, 'data': data}, block_identifier=block_identifier)
+                for data in payloads])]
+        return self._decode(results=results, outputs=outputs)
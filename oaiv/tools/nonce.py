@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""Nonce."""
+
+import time
+import heapq
+import threading
+
+
+class NonceManager:
+    # hands out nonces per sender locally, so that consecutive or parallel sends from one account
+    # do not wait for (or collide on) get_transaction_count; the chain is only asked on first use and on resync.
+    # A transaction which the node accepted and dropped later is only seen on the chain, so a sender whose oldest
+    # sent nonce is older than grace_period seconds is resynced on reserve (at most once per grace_period)
+    def __init__(self, w3, grace_period=60.0):
+        self.w3 = w3
+        self.grace_period = grace_period
+        self._lock = threading.Lock()
+        self._senders = {}
+
+    def _sender(self, address, pending=None):
+        if address not in self._senders:
+            self._senders[address] = {
+                'next': self.w3.eth.get_transaction_count(address, 'pending') if pending is None else pending,
+                # nonces which were given back and should be used before new ones, so that no gaps stay behind
+                'released': [],
+                'in_flight': set(),
+                # nonce: time it was accepted by the node
+                'sent': {},
+                'checked': time.monotonic(),
+            }
+        return self._senders[address]
+
+    def _due(self, address):
+        # whether a sent transaction has been waiting for longer than the grace period since the last check
+        with self._lock:
+            sender = self._senders.get(address)
+            if sender is None or not sender['sent']:
+                return False
+            now = time.monotonic()
+            return now - min(sender['sent'].values()) >= self.grace_period and \
+                now - sender['checked'] >= self.grace_period
+
+    @staticmethod
+    def _reserve(sender):
+        if sender['released']:
+            nonce = heapq.heappop(sender['released'])
+        else:
+            nonce = sender['next']
+            sender['next'] += 1
+        sender['in_flight'].add(nonce)
+        return nonce
+
+    def reserve(self, address):
+        if self._due(address=address):
+            self.resync(address=address)
+        with self._lock:
+            return self._reserve(sender=self._sender(address))
+
+    def confirm(self, address, nonce):
+        # the transaction with this nonce has been accepted by the node
+        with self._lock:
+            sender = self._sender(address)
+            sender['in_flight'].discard(nonce)
+            sender['sent'][nonce] = time.monotonic()
+
+    def release(self, address, nonce):
+        # the transaction with this nonce has not reached the node; the nonce goes to the next reservation
+        with self._lock:
+            sender = self._sender(address)
+            sender['in_flight'].discard(nonce)
+            if nonce not in sender['released']:
+                heapq.heappush(sender['released'], nonce)
+
+    def resync(self, address):
+        # re-reads the pending count: nonces below it are taken for good; every nonce between it and the local counter
+        # which is neither being sent right now nor waiting in the node belongs to a failed transaction, and a sent
+        # nonce equal to the pending count was dropped by the node (otherwise the count would be higher), unless it was
+        # sent within the grace period, as a lagging node may not count it yet; all of them are handed out again
+        # to fill the gaps
+        self._resync(address=address, pending=self.w3.eth.get_transaction_count(address, 'pending'))
+
+    def _resync(self, address, pending):
+        with self._lock:
+            sender = self._sender(address, pending=pending)
+            now = time.monotonic()
+            sender['next'] = max(sender['next'], pending)
+            sender['sent'] = {nonce: sent for nonce, sent in sender['sent'].items()
+                              if nonce > pending or (nonce == pending and now - sent < self.grace_period)}
+            sender['checked'] = now
+            sender['released'] = [nonce for nonce in range(pending, sender['next'])
+                                  if nonce not in sender['in_flight'] and nonce not in sender['sent']]
+            heapq.heapify(sender['released'])
+
+    def reset(self, address=None):
+        with self._lock:
+            if address is None:
+                self._senders.clear()
+            else:
+                self._senders.pop(address, None)
+
+
+class AsyncNonceManager(NonceManager):
+    # the same bookkeeping for an AsyncWeb3: the pending count is awaited before a sender is first used,
+    # so that confirm / release never have to touch the chain
+    async def _load(self, address):
+        if address not in self._senders:
+            pending = await self.w3.eth.get_transaction_count(address, 'pending')
+            with self._lock:
+                self._sender(address, pending=pending)
+
+    async def reserve(self, address):
+        await self._load(address=address)
+        if self._due(address=address):
+            await self.resync(address=address)
+        with self._lock:
+            return self._reserve(sender=self._sender(address))
+
+    async def resync(self, address):
+        self._resync(address=address, pending=await self.w3.eth.get_transaction_count(address, 'pending'))
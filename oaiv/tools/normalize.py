@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""Normalize."""
+
+import time
+from decimal import Decimal, localcontext
+
+from oaiv.tools.lazy import lazy_import
+
+
+numpy = lazy_import('numpy')
+pandas = lazy_import('pandas')
+
+
+COLUMNS = ['tx', 'datetime', 'sender', 'receiver', 'value', 'commission_paid', 'currency']
+
+WEI = Decimal('10') ** Decimal('18')
+SATOSHI = Decimal("100_000_000")
+
+
+def _scale(values, scale):
+    # values are exact integers (wei amounts do not fit into int64), so they stay in an object array
+    # and are converted with a single Decimal division per column
+    with localcontext() as context:
+        context.prec = 999
+        return numpy.fromiter(map(Decimal, values), dtype=object, count=len(values)) / scale
+
+
+def _timestamps(values):
+    # the same naive local time as datetime.datetime.fromtimestamp, parsed for the whole column at once;
+    # the local utc offset only changes on quarter-hour boundaries, so it is looked up once per such bucket
+    seconds = numpy.array(values, dtype='int64')
+    buckets = seconds // 900 * 900
+    unique, inverse = numpy.unique(buckets, return_inverse=True)
+    offsets = numpy.array([time.localtime(bucket).tm_gmtoff for bucket in unique.tolist()], dtype='int64')
+    return (seconds + offsets[inverse]).astype('datetime64[s]').astype('datetime64[us]')
+
+
+def _column(records, key, default=None):
+    return numpy.array([record.get(key, default) for record in records], dtype=object)
+
+
+def etherscan_frame(records, action='txlist'):
+    if not records:
+        return pandas.DataFrame(columns=COLUMNS)
+
+    if action == 'tokentx':
+        # TODO: control source libraries for Decimal
+        decimals = [record['tokenDecimal'] for record in records]
+        scales = {value: Decimal('10') ** Decimal(value) for value in set(decimals)}
+        with localcontext() as context:
+            context.prec = 999
+            value = _scale([record['value'] for record in records], 1) / \
+                numpy.fromiter((scales[value] for value in decimals), dtype=object, count=len(decimals))
+        currency = _column(records, 'tokenSymbol')
+    else:
+        value = _scale([record['value'] for record in records], WEI)
+        currency = 'ETH'
+
+    # internal transactions have no gas fields of their own
+    gas = [int(record.get('gasPrice') or 0) * int(record.get('gasUsed') or 0) for record in records]
+
+    return pandas.DataFrame({
+        'tx': _column(records, 'hash'),
+        'datetime': _timestamps([record['timeStamp'] for record in records]),
+        'sender': _column(records, 'from'),
+        'receiver': _column(records, 'to'),
+        'value': value,
+        'commission_paid': _scale(gas, WEI),
+        'currency': currency,
+    }, columns=COLUMNS)
+
+
+def bitcoin_frame(txs, account):
+    # inputs and outputs are summed as integer satoshi and scaled to BTC once per column
+    results = {'tx': [], 'datetime': [], 'sender': [], 'receiver': [], 'value': [], 'commission_paid': []}
+    for tx in txs:
+        self_inputs = sum(x.value for x in tx.inputs if x.address == account)
+        self_outputs = sum(x.value for x in tx.outputs if x.address == account)
+        if any(x.address == account for x in tx.inputs):
+            value = self_inputs - self_outputs
+            inputs = account
+            outputs = ';'.join([x.address for x in tx.outputs if x.address != account])
+        else:
+            value = self_outputs
+            inputs = ';'.join([x.address for x in tx.inputs])
+            outputs = account
+        results['tx'].append(tx.txid)
+        results['datetime'].append(tx.date)
+        results['sender'].append(inputs)
+        results['receiver'].append(outputs)
+        results['value'].append(value)
+        results['commission_paid'].append(tx.fee or 0)
+
+    # TODO: control source libraries for Decimal
+    results['value'] = _scale(results['value'], SATOSHI)
+    results['commission_paid'] = _scale(results['commission_paid'], SATOSHI)
+    results['currency'] = 'BTC'
+    return pandas.DataFrame(results, columns=COLUMNS)
+
+
+def _to_dict(frame, orient):
+    # DataFrame.to_dict boxes every datetime into a Timestamp one by one; converting whole columns is much cheaper
+    columns = {}
+    for column in frame.columns:
+        values = frame[column].to_numpy()
+        if numpy.issubdtype(values.dtype, numpy.datetime64):
+            values = values.astype('datetime64[us]')
+        columns[column] = values.tolist()
+    if orient == 'list':
+        return columns
+    else:
+        index = frame.index.tolist()
+        return {column: dict(zip(index, values)) for column, values in columns.items()}
+
+
+def format_frame(frame, output='dict', orient='dict'):
+    if output == 'dict':
+        return _to_dict(frame=frame, orient=orient)
+    elif output == 'frame':
+        return frame
+    elif output == 'arrow':
+        try:
+            import pyarrow
+        except ImportError:
+            raise ImportError("pyarrow is required for output='arrow'; install it with `pip install pyarrow`")
+        return pyarrow.Table.from_pandas(frame, preserve_index=False)
+    else:
+        raise ValueError("Invalid output value {0} provided; should be 'dict', 'frame' or 'arrow'".format(output))
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""Tokens."""
+
+import os
+import json
+import threading
+
+from oaiv.constants import token_info_eth, _invalid_token_handler
+from oaiv.tools.lazy import lazy_import
+from oaiv.tools.contracts import contract_registry
+
+
+eth_utils = lazy_import('eth_utils')
+
+
+class TokenRegistry:
+    # in-memory token metadata (checksum contract address, decimals) indexed both by symbol and by contract;
+    # missing decimals are fetched from the chain once and memoized, and the whole registry can be
+    # stored to / restored from a json snapshot on disk; the initial tokens and the snapshot are only registered
+    # on first use, so that building the default registry does not cost an import of the checksum helpers
+    def __init__(self, token_info=None, snapshot_path=None):
+        self.snapshot_path = snapshot_path
+        self._by_symbol = {}
+        self._by_contract = {}
+        self._lock = threading.Lock()
+        self._pending = token_info_eth if token_info is None else token_info
+        self._pending_lock = threading.Lock()
+
+    def _loaded(self):
+        if self._pending is not None:
+            with self._pending_lock:
+                if self._pending is not None:
+                    token_info = self._pending
+                    for symbol in token_info.keys():
+                        self._add(symbol=symbol, contract=token_info[symbol]['contract'],
+                                  decimals=token_info[symbol].get('decimals'))
+                    if self.snapshot_path and os.path.exists(self.snapshot_path):
+                        self._load(path=self.snapshot_path)
+                    self._pending = None
+        return self
+
+    def __contains__(self, symbol):
+        return symbol in self._loaded()._by_symbol
+
+    def _add(self, symbol, contract, decimals=None, by_symbol=True):
+        entry = {
+            'symbol': symbol,
+            'contract': eth_utils.to_checksum_address(contract),
+            'decimals': None if decimals is None else int(decimals),
+        }
+        with self._lock:
+            if by_symbol:
+                self._by_symbol[symbol] = entry
+            self._by_contract[entry['contract'].lower()] = entry
+        return entry
+
+    def register(self, symbol, contract, decimals=None):
+        return self._loaded()._add(symbol=symbol, contract=contract, decimals=decimals)
+
+    def get(self, symbol):
+        try:
+            return self._loaded()._by_symbol[symbol]
+        except KeyError:
+            _invalid_token_handler(symbol)
+
+    def by_contract(self, contract):
+        try:
+            return self._loaded()._by_contract[contract.lower()]
+        except KeyError:
+            _invalid_token_handler(contract)
+
+    def resolve(self, w3, contract):
+        # registers a token met by its contract address, reading its symbol and decimals from the chain once;
+        # it is indexed by contract only, as any contract may claim the symbol of a registered token
+        if contract.lower() not in self._loaded()._by_contract:
+            token = contract_registry.contract(w3=w3, address=contract)
+            self._add(symbol=token.functions.symbol().call(), contract=contract,
+                      decimals=token.functions.decimals().call(), by_symbol=False)
+        return self.by_contract(contract=contract)
+
+    def symbols(self):
+        return list(self._loaded()._by_symbol.keys())
+
+    def contract(self, symbol):
+        return self.get(symbol=symbol)['contract']
+
+    def decimals(self, w3, symbol):
+        entry = self.get(symbol=symbol)
+        if entry['decimals'] is None:
+            contract = contract_registry.contract(w3=w3, address=entry['contract'])
+            entry['decimals'] = contract.functions.decimals().call()
+        return entry['decimals']
+
+    async def decimals_async(self, w3, symbol):
+        # the same memoization for an AsyncWeb3
+        entry = self.get(symbol=symbol)
+        if entry['decimals'] is None:
+            contract = contract_registry.contract(w3=w3, address=entry['contract'])
+            entry['decimals'] = await contract.functions.decimals().call()
+        return entry['decimals']
+
+    def preload(self, w3):
+        for symbol in list(self._loaded()._by_symbol.keys()):
+            self.decimals(w3=w3, symbol=symbol)
+        if self.snapshot_path:
+            self.save(path=self.snapshot_path)
+
+    def _load(self, path):
+        with open(path, 'r') as file:
+            snapshot = json.load(file)
+        for symbol in snapshot.keys():
+            self._add(symbol=symbol, contract=snapshot[symbol]['contract'], decimals=snapshot[symbol]['decimals'])
+
+    def load(self, path):
+        self._loaded()._load(path=path)
+
+    def save(self, path):
+        self._loaded()
+        with self._lock:
+            snapshot = {symbol: {'contract': entry['contract'], 'decimals': entry['decimals']}
+                        for symbol, entry in self._by_symbol.items()}
+        with open(path, 'w') as file:
+            json.dump(snapshot, file, indent=2)
+
+
+token_registry = TokenRegistry()
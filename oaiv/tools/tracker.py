@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""Tracker."""
+
+import time
+import heapq
+import logging
+import threading
+from concurrent.futures import Future
+
+
+logger = logging.getLogger(__name__)
+
+
+class ConfirmationTracker:
+    # polls any number of pending txids from one background thread, each with its own exponential backoff;
+    # track() returns a Future right away, which resolves to a status dict:
+    # {'txid', 'status': 'sent' | 'not_sent', 'confirmations', 'error'}
+    def __init__(self, lookup, initial_delay=1, max_delay=60, backoff=2, timeout=600):
+        # lookup(txid) returns the transaction (or something falsy) as seen by the providers
+        self.lookup = lookup
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.backoff = backoff
+        self.timeout = timeout
+        self._pending = {}
+        self._schedule = []
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+    def track(self, txid, error=None):
+        with self._condition:
+            if txid in self._pending:
+                return self._pending[txid]['future']
+            now = time.monotonic()
+            self._pending[txid] = {
+                'future': Future(),
+                'delay': self.initial_delay,
+                'deadline': now + self.timeout,
+                'error': error,
+            }
+            heapq.heappush(self._schedule, (now + self.initial_delay, txid))
+            if self._thread is None:
+                self._stopped = False
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._condition.notify()
+            return self._pending[txid]['future']
+
+    def pending(self):
+        with self._condition:
+            return list(self._pending.keys())
+
+    def _resolve(self, txid, status, confirmations=None):
+        entry = self._pending.pop(txid)
+        result = {'txid': txid, 'status': status, 'confirmations': confirmations, 'error': entry['error']}
+        if status == 'sent':
+            logger.info("Transaction %s is found in the blockchain", txid)
+        else:
+            logger.error("Transaction %s is not sent to the blockchain; error message: %s", txid, entry['error'])
+        entry['future'].set_result(result)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._stopped and (not self._schedule or self._schedule[0][0] > time.monotonic()):
+                    self._condition.wait(timeout=None if not self._schedule else
+                                         self._schedule[0][0] - time.monotonic())
+                if self._stopped:
+                    return
+                _, txid = heapq.heappop(self._schedule)
+
+            try:
+                tx = self.lookup(txid)
+            except Exception as e:
+                logger.debug("Lookup of transaction %s failed: %s", txid, e)
+                tx = None
+
+            with self._condition:
+                entry = self._pending.get(txid)
+                if entry is None:
+                    continue
+                if tx:
+                    self._resolve(txid=txid, status='sent', confirmations=getattr(tx, 'confirmations', None))
+                elif time.monotonic() >= entry['deadline']:
+                    self._resolve(txid=txid, status='not_sent')
+                else:
+                    entry['delay'] = min(entry['delay'] * self.backoff, self.max_delay)
+                    heapq.heappush(self._schedule, (time.monotonic() + entry['delay'], txid))
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            for entry in self._pending.values():
+                entry['future'].cancel()
+            self._pending.clear()
+            self._schedule.clear()
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
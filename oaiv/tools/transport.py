@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""Transport."""
+
+import threading
+
+from oaiv.tools.lazy import lazy_import
+
+
+requests = lazy_import('requests')
+requests_adapters = lazy_import('requests.adapters')
+aiohttp = lazy_import('aiohttp')
+
+
+DEFAULT_TIMEOUT = 30
+
+
+def rpc_payload(calls):
+    return [{'jsonrpc': '2.0', 'id': i, 'method': method, 'params': params} for i, (method, params) in enumerate(calls)]
+
+
+def rpc_responses(payload, responses):
+    if isinstance(responses, dict):
+        # the whole batch has been rejected
+        return [{'error': responses.get('error', responses)}] * len(payload)
+    responses = {response.get('id'): response for response in responses}
+    return [responses.get(i, {'error': {'message': 'No response received'}}) for i in range(len(payload))]
+
+
+class HTTPTransport:
+    # a keep-alive connection pool shared by the REST clients and the web3 HTTPProvider,
+    # so that consecutive calls to the same host reuse the established TCP / TLS connection;
+    # the session (and the import of requests) is only made on first use
+    def __init__(self, pool_connections=10, pool_maxsize=10, timeout=DEFAULT_TIMEOUT, gzip=True, max_retries=0):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.timeout = timeout
+        self.gzip = gzip
+        self.max_retries = max_retries
+        self._session = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = requests_adapters.HTTPAdapter(pool_connections=self.pool_connections,
+                                                            pool_maxsize=self.pool_maxsize,
+                                                            max_retries=self.max_retries)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    session.headers['Accept-Encoding'] = 'gzip, deflate' if self.gzip else 'identity'
+                    self._session = session
+        return self._session
+
+    def get_json(self, url, params=None):
+        response = self.session.get(url, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def post_json(self, url, data):
+        response = self.session.post(url, json=data, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def rpc_batch(self, url, calls):
+        # sends [(method, params), ...] as one JSON-RPC batch; the responses come back in the order of calls,
+        # each being {'result': ...} or {'error': {...}}
+        payload = rpc_payload(calls=calls)
+        if not payload:
+            return []
+        return rpc_responses(payload=payload, responses=self.post_json(url=url, data=payload))
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+
+
+class AsyncHTTPTransport:
+    # the asyncio counterpart of HTTPTransport: one aiohttp session (and connection pool) for the async REST clients;
+    # the session is opened on first use, inside the running event loop
+    def __init__(self, pool_maxsize=10, timeout=DEFAULT_TIMEOUT, gzip=True):
+        self.pool_maxsize = pool_maxsize
+        self.timeout = timeout
+        self.gzip = gzip
+        self._session = None
+
+    async def session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_maxsize),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={'Accept-Encoding': 'gzip, deflate' if self.gzip else 'identity'},
+            )
+        return self._session
+
+    async def get_json(self, url, params=None):
+        session = await self.session()
+        async with session.get(url, params=params) as response:
+            response.raise_for_status()
+            return await response.json(content_type=None)
+
+    async def post_json(self, url, data):
+        session = await self.session()
+        async with session.post(url, json=data) as response:
+            response.raise_for_status()
+            return await response.json(content_type=None)
+
+    async def rpc_batch(self, url, calls):
+        payload = rpc_payload(calls=calls)
+        if not payload:
+            return []
+        return rpc_responses(payload=payload, responses=await self.post_json(url=url, data=payload))
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
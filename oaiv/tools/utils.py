@@ -3,16 +3,21 @@
 
 from decimal import Decimal
 
-from web3 import Web3
-from web3.middleware import geth_poa_middleware
+from oaiv.tools.lazy import lazy_import
+from oaiv.tools.tokens import token_registry
+from oaiv.tools.contracts import contract_registry
 
-from oaiv.constants import get_precision_eth
 
+web3 = lazy_import('web3')
+web3_middleware = lazy_import('web3.middleware')
+aiohttp = lazy_import('aiohttp')
 
-def data_constructor(w3, receiver_address, amount, currency):
-    method = '0xa9059cbb'
+
+def data_constructor(w3, receiver_address, amount, currency, registry=None):
+    registry = registry or token_registry
+    method = contract_registry.selector(name='EIP20', fn_name='transfer')
     receiver = "0" * (64 - len(receiver_address[2:])) + receiver_address[2:]
-    amount_precision = get_precision_eth(w3=w3, token_name=currency)
+    amount_precision = registry.decimals(w3=w3, symbol=currency)
     amount = hex(int(Decimal(amount) * (Decimal(10) ** Decimal(amount_precision))))[2:]
     amount = "0" * (64 - len(amount)) + amount
     data = method + receiver + amount
@@ -27,7 +32,24 @@ def format_provider(ethereum_network, infura_project_id):
     return provider
 
 
-def format_w3(provider):
-    w3 = Web3(Web3.HTTPProvider(provider))
-    w3.middleware_onion.inject(geth_poa_middleware, layer=0)
+def format_w3(provider, transport=None):
+    if transport is not None:
+        http_provider = web3.Web3.HTTPProvider(provider, request_kwargs={'timeout': transport.timeout},
+                                               session=transport.session)
+    else:
+        http_provider = web3.Web3.HTTPProvider(provider)
+    w3 = web3.Web3(http_provider)
+    w3.middleware_onion.inject(web3_middleware.geth_poa_middleware, layer=0)
+    return w3
+
+
+def format_async_w3(provider, transport=None):
+    # AsyncHTTPProvider keeps its own aiohttp session per endpoint, which is reused across calls
+    if transport is not None:
+        http_provider = web3.AsyncWeb3.AsyncHTTPProvider(
+            provider, request_kwargs={'timeout': aiohttp.ClientTimeout(total=transport.timeout)})
+    else:
+        http_provider = web3.AsyncWeb3.AsyncHTTPProvider(provider)
+    w3 = web3.AsyncWeb3(http_provider)
+    w3.middleware_onion.inject(web3_middleware.async_geth_poa_middleware, layer=0)
     return w3
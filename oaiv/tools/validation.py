@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""Validation."""
+
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from oaiv.constants import BlockchainType
+from oaiv.tools.lazy import lazy_import
+
+
+bitcoinlib_encoding = lazy_import('bitcoinlib.encoding')
+bitcoinlib_keys = lazy_import('bitcoinlib.keys')
+bitcoinlib_networks = lazy_import('bitcoinlib.networks')
+eth_utils = lazy_import('eth_utils')
+
+
+DEFAULT_MAXSIZE = 100_000
+DEFAULT_POOL_THRESHOLD = 50_000
+DEFAULT_CHUNK_SIZE = 5_000
+
+_HEX_ADDRESS = re.compile('(0x)?[0-9a-f]{40}', re.IGNORECASE)
+
+
+def _bitcoin_formatted(address):
+    # bech32 may be written all uppercase (BIP173), while bitcoinlib only parses the lowercase form;
+    # base58 is case-sensitive and is kept as it is
+    hrp, separator, _ = address.rpartition('1')
+    if separator and hrp.isalpha() and address == address.upper():
+        return address.lower()
+    return address
+
+
+def bitcoin_address_info(address):
+    # (is_address, is_supported, is_formatted_address, formatted) out of a single Address.parse;
+    # an address which bitcoinlib fails to parse is an invalid one, so that it does not abort a batch
+    if not isinstance(address, str) or len(address) == 0:
+        return False, False, False, None
+    formatted = _bitcoin_formatted(address)
+    try:
+        parsed = bitcoinlib_keys.Address.parse(formatted)
+    except (bitcoinlib_encoding.EncodingError, bitcoinlib_networks.NetworkError, bitcoinlib_keys.BKeyError):
+        return False, False, False, None
+    # only p2pkh / p2wpkh addressed derived from compressed public_key are supported
+    supported = any([(parsed.encoding == 'base58') and (parsed.script_type == 'p2pkh'),
+                     (parsed.encoding == 'bech32') and (parsed.script_type == 'p2wpkh')])
+    return True, supported, address == formatted, formatted
+
+
+def ethereum_address_info(address):
+    # the same answers as the w3 helpers, with one keccak per address instead of one per check
+    if not isinstance(address, str):
+        valid = eth_utils.is_address(address)
+        return (valid, valid, valid and eth_utils.is_checksum_address(address),
+                eth_utils.to_checksum_address(address) if valid else None)
+    if _HEX_ADDRESS.fullmatch(address) is None:
+        return False, False, False, None
+    formatted = eth_utils.to_checksum_address(address)
+    unprefixed = address[2:] if address[:2].lower() == '0x' else address
+    if unprefixed != unprefixed.lower() and unprefixed != unprefixed.upper() and address != formatted:
+        # mixed case is a checksum, and a wrong one means a mistyped address (as eth_utils.is_address tells)
+        return False, False, False, None
+    return True, True, address == formatted, formatted
+
+
+ADDRESS_INFO = {
+    BlockchainType.BITCOIN: bitcoin_address_info,
+    BlockchainType.ETHEREUM: ethereum_address_info,
+}
+
+
+def _chunk_info(blockchain, addresses):
+    return [ADDRESS_INFO[blockchain](address) for address in addresses]
+
+
+class AddressValidator:
+    # batch counterpart of is_address / is_supported / is_formatted_address / format_address:
+    # results are lists aligned with the input, recent answers are kept in an LRU memo,
+    # and large sets of unseen addresses are checked in a process pool
+    def __init__(self, blockchain, maxsize=DEFAULT_MAXSIZE, pool_threshold=DEFAULT_POOL_THRESHOLD, processes=None,
+                 chunk_size=DEFAULT_CHUNK_SIZE):
+        if blockchain not in ADDRESS_INFO.keys():
+            raise KeyError("Invalid blockchain type {0} is entered; please, check available ones".format(blockchain))
+        self.blockchain = blockchain
+        self.maxsize = maxsize
+        self.pool_threshold = pool_threshold
+        self.processes = processes
+        self.chunk_size = chunk_size
+        self._memo = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _compute(self, addresses):
+        if len(addresses) < self.pool_threshold or self.processes == 1:
+            return _chunk_info(blockchain=self.blockchain, addresses=addresses)
+        chunks = [addresses[i:i + self.chunk_size] for i in range(0, len(addresses), self.chunk_size)]
+        with ProcessPoolExecutor(max_workers=self.processes) as executor:
+            results = []
+            for infos in executor.map(_chunk_info, [self.blockchain] * len(chunks), chunks):
+                results += infos
+            return results
+
+    def info(self, addresses):
+        addresses = list(addresses)
+        known = {}
+        missing = []
+        with self._lock:
+            for address in addresses:
+                if not isinstance(address, str):
+                    continue
+                if address in self._memo:
+                    self._memo.move_to_end(address)
+                    known[address] = self._memo[address]
+                elif address not in known:
+                    known[address] = None
+                    missing.append(address)
+
+        if missing:
+            computed = self._compute(addresses=missing)
+            with self._lock:
+                for address, info in zip(missing, computed):
+                    known[address] = info
+                    self._memo[address] = info
+                while len(self._memo) > self.maxsize:
+                    self._memo.popitem(last=False)
+
+        info_function = ADDRESS_INFO[self.blockchain]
+        return [known[address] if isinstance(address, str) else info_function(address) for address in addresses]
+
+    def validate(self, addresses):
+        infos = self.info(addresses=addresses)
+        return {
+            'is_address': [info[0] for info in infos],
+            'is_supported': [info[1] for info in infos],
+            'is_formatted_address': [info[2] for info in infos],
+            # None for the invalid addresses
+            'formatted': [info[3] for info in infos],
+        }
+
+    def is_address(self, addresses):
+        return [info[0] for info in self.info(addresses=addresses)]
+
+    def is_supported(self, addresses):
+        return [info[1] for info in self.info(addresses=addresses)]
+
+    def is_formatted_address(self, addresses):
+        return [info[2] for info in self.info(addresses=addresses)]
+
+    def format_address(self, addresses):
+        return [info[3] for info in self.info(addresses=addresses)]
+
+    def clear(self):
+        with self._lock:
+            self._memo.clear()
+
+
+bitcoin_address_validator = AddressValidator(blockchain=BlockchainType.BITCOIN)
+ethereum_address_validator = AddressValidator(blockchain=BlockchainType.ETHEREUM)
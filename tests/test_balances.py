@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""Balances tests."""
+
+from decimal import Decimal
+
+from web3 import Web3
+
+from oaiv.tools.balances import BalanceMatrix
+from oaiv.tools.contracts import contract_registry
+from oaiv.tools.address import find_address
+from oaiv.tools.tokens import TokenRegistry
+
+
+HOLDER = '0x1111111111111111111111111111111111111111'
+OTHER = '0x2222222222222222222222222222222222222222'
+TKA = '0xaAaAaAaaAaAaAaaAaAAAAAAAAaaaAaAaAaaAaaAa'
+TKB = '0xbBbBBBBbbBBBbbbBbbBbbbbBBbBbbbbBbBbbBBbB'
+BAD = '0xCcCCccccCCCCcCCCCCCcCcCccCcCCCcCcccccccC'
+LATEST = 20
+
+# block -> (ETH or token contract, holder) -> balance in the smallest unit
+CHAIN = {
+    10: {('ETH', HOLDER): 10 ** 18, (TKA, HOLDER): 5 * 10 ** 6, (TKB, HOLDER): 10 ** 8,
+         ('ETH', OTHER): 0, (TKA, OTHER): 10 ** 6, (TKB, OTHER): 0},
+    LATEST: {('ETH', HOLDER): 3 * 10 ** 18, (TKA, HOLDER): 7 * 10 ** 6, (TKB, HOLDER): 2 * 10 ** 8,
+             ('ETH', OTHER): 10 ** 17, (TKA, OTHER): 0, (TKB, OTHER): 0},
+}
+DECIMALS = {TKA: 6, TKB: 8}
+
+
+class ChainMulticall:
+    # answers the calls of BalanceMatrix from CHAIN and records the blocks they were pinned to;
+    # the BAD token reverts on every call
+    def __init__(self, w3):
+        self.contract = contract_registry.contract(w3=w3, address=find_address(name='MULTICALL3'), name='MULTICALL3')
+        self.blocks = []
+
+    def block_number(self, block_identifier=None):
+        return LATEST if block_identifier is None else block_identifier
+
+    def call(self, calls, block_identifier='latest'):
+        self.blocks.append(block_identifier)
+        values = []
+        for contract, fn_name, args in calls:
+            if contract.address == BAD:
+                values.append(None)
+            elif fn_name == 'decimals':
+                values.append(DECIMALS[contract.address])
+            elif fn_name == 'getEthBalance':
+                values.append(CHAIN[block_identifier][('ETH', args[0])])
+            else:
+                values.append(CHAIN[block_identifier][(contract.address, args[0])])
+        return values
+
+
+def balance_matrix():
+    w3 = Web3(Web3.HTTPProvider('http://localhost:8545'))
+    token_registry = TokenRegistry(token_info={'TKA': {'contract': TKA}, 'TKB': {'contract': TKB, 'decimals': 8},
+                                               'BAD': {'contract': BAD}})
+    return BalanceMatrix(w3=w3, token_registry=token_registry, multicall=ChainMulticall(w3=w3)), token_registry
+
+
+def test_snapshot_reads_every_address_and_currency():
+    matrix, token_registry = balance_matrix()
+    view = matrix.snapshot(addresses=[HOLDER, OTHER], currencies=['ETH', 'TKA', 'TKB'])
+
+    assert view['block'] == LATEST
+    assert view['balances'] == {
+        HOLDER: {'ETH': Decimal(3), 'TKA': Decimal(7), 'TKB': Decimal(2)},
+        OTHER: {'ETH': Decimal('0.1'), 'TKA': Decimal(0), 'TKB': Decimal(0)},
+    }
+    assert view['failures'] == {}
+    # the missing decimals were read in the same call and memoized
+    assert token_registry.get(symbol='TKA')['decimals'] == 6
+
+
+def test_snapshot_keeps_every_failed_currency_of_an_address():
+    matrix, _ = balance_matrix()
+    token_registry = matrix.token_registry
+    token_registry.register(symbol='BAD2', contract=BAD, decimals=18)
+    view = matrix.snapshot(addresses=[HOLDER], currencies=['ETH', 'BAD', 'BAD2'])
+
+    assert view['balances'] == {HOLDER: {'ETH': Decimal(3)}}
+    assert set(view['failures'].keys()) == {(HOLDER, 'BAD'), (HOLDER, 'BAD2')}
+
+
+def test_snapshot_is_pinned_to_one_block():
+    matrix, _ = balance_matrix()
+
+    latest = matrix.snapshot(addresses=[HOLDER], currencies=['ETH', 'TKA', 'TKB'])
+    assert matrix.multicall.blocks == [LATEST]
+    assert latest['balances'][HOLDER]['ETH'] == Decimal(3)
+
+    past = matrix.snapshot(addresses=[HOLDER], currencies=['ETH', 'TKA', 'TKB'], block_identifier=10)
+    assert matrix.multicall.blocks == [LATEST, 10]
+    assert past['block'] == 10
+    assert past['balances'][HOLDER] == {'ETH': Decimal(1), 'TKA': Decimal(5), 'TKB': Decimal(1)}
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+"""Derivation tests."""
+
+from oaiv.constants import BlockchainType
+from oaiv.tools.derivation import AddressDeriver, account_path
+
+
+# the BIP84 test vectors
+MNEMONIC = 'abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon about'
+
+
+def test_coin_type_follows_the_network():
+    assert account_path(blockchain=BlockchainType.BITCOIN, purpose=84) == "m/84'/0'/0'"
+    assert account_path(blockchain=BlockchainType.BITCOIN, purpose=84, network='testnet') == "m/84'/1'/0'"
+    assert account_path(blockchain=BlockchainType.ETHEREUM, network='testnet') == "m/44'/60'/0'"
+
+
+def test_bip84_addresses_on_mainnet_and_testnet():
+    mainnet = AddressDeriver(blockchain=BlockchainType.BITCOIN, mnemonic=MNEMONIC)
+    testnet = AddressDeriver(blockchain=BlockchainType.BITCOIN, mnemonic=MNEMONIC, network='testnet')
+
+    assert mainnet.address(index=0) == 'bc1qcr8te4kr609gcawutmrza0j4xv80jy8z306fyu'
+    assert testnet.address(index=0) == 'tb1q6rz28mcfaxtmd6v789l9rrlrusdprr9pqcpvkl'
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""Key pair tests."""
+
+from bitcoinlib.keys import HDKey
+from eth_account import Account
+
+from oaiv.constants import BlockchainType
+from oaiv.tools.keypair import bitcoin_key_pair, ethereum_key_pair, verify_key_pairs
+
+
+PRIVATE_KEY = '11' * 32
+ETHEREUM_ADDRESS = Account.from_key('0x' + PRIVATE_KEY).address
+
+
+def test_ethereum_key_out_of_the_curve_order_is_not_a_pair():
+    for private_key in ['0x' + 'ff' * 32, '0x' + '00' * 32, b'\xff' * 32]:
+        assert ethereum_key_pair(private_key=private_key, address=ETHEREUM_ADDRESS) is False
+
+
+def test_ethereum_invalid_key_does_not_abort_the_batch():
+    pairs = [('0x' + PRIVATE_KEY, ETHEREUM_ADDRESS), ('0x' + 'ff' * 32, ETHEREUM_ADDRESS)]
+    assert verify_key_pairs(blockchain=BlockchainType.ETHEREUM, pairs=pairs) == [True, False]
+
+
+def test_bitcoin_key_matches_the_address_of_its_network_only():
+    mainnet = HDKey(PRIVATE_KEY, compressed=True)
+    testnet = HDKey(PRIVATE_KEY, compressed=True, network='testnet')
+    for script_type, encoding in [('p2wpkh', 'bech32'), ('p2pkh', 'base58')]:
+        mainnet_address = mainnet.address(script_type=script_type, encoding=encoding)
+        testnet_address = testnet.address(script_type=script_type, encoding=encoding)
+
+        assert bitcoin_key_pair(private_key=PRIVATE_KEY, address=mainnet_address) is True
+        # the same hash160 under the testnet prefix
+        assert bitcoin_key_pair(private_key=PRIVATE_KEY, address=testnet_address) is False
+        assert bitcoin_key_pair(private_key=testnet.wif_key(), address=testnet_address) is True
+        assert bitcoin_key_pair(private_key=testnet.wif_key(), address=mainnet_address) is False
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""Nonce tests."""
+
+from types import SimpleNamespace
+
+from oaiv.tools import nonce
+from oaiv.tools.nonce import NonceManager
+
+
+SENDER = '0x1111111111111111111111111111111111111111'
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def nonce_manager(pending, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(nonce.time, 'monotonic', clock)
+    eth = SimpleNamespace(get_transaction_count=lambda address, block_identifier: pending[0])
+    return NonceManager(w3=SimpleNamespace(eth=eth), grace_period=60), clock
+
+
+def test_recently_sent_nonce_is_not_reissued_by_a_lagging_node(monkeypatch):
+    pending = [5]
+    manager, _ = nonce_manager(pending=pending, monkeypatch=monkeypatch)
+    sent, failed = manager.reserve(SENDER), manager.reserve(SENDER)
+    manager.confirm(SENDER, sent)
+    manager.release(SENDER, failed)
+    # the node does not count the accepted transaction yet
+    manager.resync(SENDER)
+
+    assert [manager.reserve(SENDER), manager.reserve(SENDER)] == [6, 7]
+
+
+def test_dropped_nonce_is_reissued_after_the_grace_period(monkeypatch):
+    pending = [10]
+    manager, clock = nonce_manager(pending=pending, monkeypatch=monkeypatch)
+    for _ in range(3):
+        manager.confirm(SENDER, manager.reserve(SENDER))
+    assert manager.reserve(SENDER) == 13
+
+    # 10 has been dropped, 11 and 12 wait behind it, so the pending count stays at 10
+    clock.now = 61
+    assert manager.reserve(SENDER) == 10
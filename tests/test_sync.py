@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""Sync tests."""
+
+from types import SimpleNamespace
+
+from oaiv.constants import BlockchainType
+from oaiv.core.account import EtherscanInteraction, EtherscanCursor
+from oaiv.core.sync import TransactionStore, TransactionSync
+
+
+ACCOUNT = '0x1111111111111111111111111111111111111111'
+TOKEN = '0x2222222222222222222222222222222222222222'
+
+
+def token_transfer(receiver, value, tx='0xaa', block='100'):
+    # tokentx records come without a logIndex
+    return {'hash': tx, 'blockNumber': block, 'timeStamp': '1700000000', 'from': ACCOUNT, 'to': receiver,
+            'value': value, 'contractAddress': TOKEN, 'tokenSymbol': 'TKN', 'tokenDecimal': '6',
+            'gasPrice': '1', 'gasUsed': '21000'}
+
+
+# two transfers of one multi-send transaction
+MULTI_SEND = [token_transfer(receiver='0x3333333333333333333333333333333333333333', value='1000000'),
+              token_transfer(receiver='0x4444444444444444444444444444444444444444', value='2000000')]
+
+
+# the same transfer twice in one transaction, and another one
+REPEATED_SEND = [MULTI_SEND[0], dict(MULTI_SEND[0]), MULTI_SEND[1]]
+
+
+class EtherscanTransport:
+    def __init__(self, records):
+        self.records = records
+
+    def get_json(self, url, params):
+        if params['action'] == 'tokentx' and int(params['startblock']) <= 100 and params['page'] == 1:
+            return {'status': '1', 'message': 'OK', 'result': self.records}
+        return {'status': '0', 'message': 'No transactions found', 'result': []}
+
+
+def etherscan(records):
+    return EtherscanInteraction(network='mainnet', etherscan_api_key='key', rate_limit=1000,
+                                transport=EtherscanTransport(records=records))
+
+
+def test_record_key_tells_apart_transfers_of_one_transaction():
+    keys = {EtherscanCursor.record_key(record) for record in MULTI_SEND}
+    assert len(keys) == 2
+
+
+def test_iter_transactions_yields_every_transfer_of_one_transaction():
+    records = list(etherscan(records=MULTI_SEND).iter_transactions(account=ACCOUNT, action='tokentx'))
+    assert [record['to'] for record in records] == [record['to'] for record in MULTI_SEND]
+
+
+def test_sync_stores_every_transfer_of_one_transaction():
+    interaction = SimpleNamespace(format_address=lambda address, blockchain: address,
+                                  ethereum_interaction=SimpleNamespace(etherscan=etherscan(records=MULTI_SEND)))
+    sync = TransactionSync(interaction=interaction, store=TransactionStore(), etherscan_actions=('tokentx',))
+
+    assert sync.sync(account=ACCOUNT, blockchain=BlockchainType.ETHEREUM) == 2
+    # a second sync resumes from the stored cursor and fetches nothing new
+    assert sync.sync(account=ACCOUNT, blockchain=BlockchainType.ETHEREUM) == 0
+
+    transactions = sync.get_transactions(account=ACCOUNT, blockchain=BlockchainType.ETHEREUM, sync=False)
+    assert sorted(transactions['receiver']) == sorted(record['to'] for record in MULTI_SEND)
+    assert sorted(transactions['value']) == [1, 2]
+
+
+def test_sync_stores_identical_transfers_of_one_transaction():
+    interaction = SimpleNamespace(format_address=lambda address, blockchain: address,
+                                  ethereum_interaction=SimpleNamespace(etherscan=etherscan(records=REPEATED_SEND)))
+    # one record per batch, so that the repetitions are stored separately
+    sync = TransactionSync(interaction=interaction, store=TransactionStore(), etherscan_actions=('tokentx',),
+                           batch_size=1)
+
+    assert sync.sync(account=ACCOUNT, blockchain=BlockchainType.ETHEREUM) == 3
+    assert sync.sync(account=ACCOUNT, blockchain=BlockchainType.ETHEREUM) == 0
+
+    transactions = sync.get_transactions(account=ACCOUNT, blockchain=BlockchainType.ETHEREUM, sync=False)
+    assert sorted(transactions['value']) == [1, 1, 2]
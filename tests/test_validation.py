@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""Validation tests."""
+
+from oaiv.constants import BlockchainType
+from oaiv.tools.validation import AddressValidator, bitcoin_address_info
+
+
+BECH32 = 'bc1ql3e9pgs3mmwuwrh95fecme0s0qtn2880lsvsd5'
+BASE58 = '1BvBMSEYstWetqTFn5Au4m4GFg7xJaNVN2'
+
+
+def test_uppercase_bech32_is_a_valid_address():
+    assert bitcoin_address_info(BECH32.upper()) == (True, True, False, BECH32)
+    assert bitcoin_address_info(BECH32) == (True, True, True, BECH32)
+    # mixed case is not allowed by BIP173, and base58 is case-sensitive
+    assert bitcoin_address_info(BECH32[:2].upper() + BECH32[2:])[0] is False
+    assert bitcoin_address_info(BASE58.upper())[0] is False
+
+
+def test_unparsable_address_does_not_abort_the_batch():
+    addresses = [BECH32, 'BC1' + 'Q' * 39, BECH32.upper(), 'xyz', BASE58]
+    expected = [True, False, True, False, True]
+
+    assert AddressValidator(blockchain=BlockchainType.BITCOIN).is_address(addresses) == expected
+    pooled = AddressValidator(blockchain=BlockchainType.BITCOIN, pool_threshold=1, processes=2, chunk_size=2)
+    assert pooled.is_address(addresses) == expected